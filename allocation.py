@@ -0,0 +1,41 @@
+import numpy as np
+
+
+# Round a (rows x weeks) hours matrix to multiples of `quantum` so that every row
+# sums exactly to its budget, using largest-remainder apportionment.
+#
+# `totals` is the budget of each row (defaults to the row sums) and is itself
+# rounded to the nearest quantum. Every cell is first rounded down; the units that
+# are left over go to the cells with the largest remainders (earliest week first on
+# ties). All rows are processed at once, without a Python loop over rows.
+def allocate_exact(hours, totals=None, quantum=1.0):
+    if quantum <= 0:
+        raise ValueError("quantum must be greater than 0.")
+    hours = np.asarray(hours, dtype=np.float64)
+    squeeze = hours.ndim == 1
+    hours = np.atleast_2d(hours)
+    if np.any(hours < 0):
+        raise ValueError("Hours must not be negative.")
+
+    row_sums = hours.sum(axis=1)
+    totals = row_sums if totals is None else np.broadcast_to(np.asarray(totals, dtype=np.float64), row_sums.shape)
+    units_total = np.rint(totals / quantum)
+
+    # Scale every row so its shares add up to the (rounded) budget in units
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(row_sums > 0, units_total / row_sums, 0.0)
+    shares = hours * scale[:, None]
+
+    units = np.floor(shares)
+    remainders = shares - units
+    missing = np.clip(units_total - units.sum(axis=1), 0, hours.shape[1]).astype(np.int64)
+    missing[row_sums <= 0] = 0  # Nothing to spread the budget over
+
+    # Rank the remainders within each row (0 = largest) and hand out the missing units
+    order = np.argsort(-remainders, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(hours.shape[1])[None, :], axis=1)
+    units += ranks < missing[:, None]
+
+    allocated = units * quantum
+    return allocated[0] if squeeze else allocated
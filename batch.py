@@ -0,0 +1,119 @@
+import numpy as np
+
+from resample import check_method, cumulative_share, curve_key, rebin_cumulative, scale_curve
+
+
+# Names of the built-in analytic shapes
+SHAPE_NAMES = ('linear', 'bell', 'front loaded', 'back loaded')
+
+
+# Built-in analytic shapes, matching the shapes offered by redistribute_hours
+def shape_curve(curve_type, num_weeks):
+    if curve_type == 'linear':
+        curve = np.ones(num_weeks)
+    elif curve_type == 'bell':
+        curve = np.exp(-0.5 * (np.linspace(-2, 2, num_weeks) ** 2))
+    elif curve_type == 'front loaded':
+        curve = np.linspace(1.5, 0.5, num_weeks)
+    elif curve_type == 'back loaded':
+        curve = np.linspace(0.5, 1.5, num_weeks)
+    else:
+        return None
+    return curve / np.sum(curve)  # Normalize
+
+
+# Stack the resampled curves for the given names into one (curves x weeks) matrix.
+# Names are looked up in `curves` first and then among the built-in shapes.
+# `method` selects how curves are resampled (see resample.RESAMPLE_METHODS); a
+# CurveRegistry supplies its precomputed cumulative shares for the area methods.
+# Cached resampled curves are keyed by curve content, never by name alone, since
+# different curve sets may use the same name for different curves.
+def curve_matrix(curves, names, num_weeks, method='linear'):
+    check_method(method)
+    cumulative = getattr(curves, 'cumulative', None)
+    rows = [np.empty((0, num_weeks))]
+    for name in names:
+        if name in curves:
+            curve_cumulative = None if cumulative is None else cumulative[curves.row(name)]
+            key = curves.key(name) if hasattr(curves, 'key') else curve_key(curves[name])
+            rows.append(scale_curve(curves[name], len(curves[name]), num_weeks, key=key,
+                                    method=method, cumulative=curve_cumulative))
+            continue
+        curve = shape_curve(name, num_weeks)
+        if curve is None:
+            raise ValueError(f"Unknown curve: {name}")
+        rows.append(curve)
+    return np.vstack(rows)
+
+
+# Function to redistribute a whole batch of (hours, curve) rows at once.
+# `num_weeks` is either one week count for every row or one week count per row.
+# Returns a (rows x weeks) matrix of hours; with per-row week counts the matrix is
+# as wide as the longest row and shorter rows are padded with zeros.
+def redistribute_batch(curves, total_hours, curve_ids, num_weeks, method='linear'):
+    total_hours = np.asarray(total_hours, dtype=np.float64)
+    curve_ids = np.asarray(curve_ids)
+    if total_hours.shape != curve_ids.shape or total_hours.ndim != 1:
+        raise ValueError("total_hours and curve_ids must be 1-D and of equal length.")
+
+    # Map every row onto a row of the stacked curve matrix
+    names, codes = np.unique(curve_ids, return_inverse=True)
+
+    num_weeks = np.asarray(num_weeks, dtype=np.int64)
+    if num_weeks.ndim == 0:
+        if num_weeks <= 0:
+            raise ValueError("Number of weeks must be greater than 0.")
+        stacked = curve_matrix(curves, names, int(num_weeks), method)
+        return total_hours[:, None] * stacked[codes]
+
+    if num_weeks.shape != total_hours.shape:
+        raise ValueError("num_weeks must be a single value or one value per row.")
+    if len(num_weeks) and num_weeks.min() <= 0:
+        raise ValueError("Number of weeks must be greater than 0.")
+
+    # One broadcasted multiply per distinct week count
+    result = np.zeros((len(total_hours), int(num_weeks.max(initial=0))))
+    for weeks in np.unique(num_weeks):
+        rows = np.flatnonzero(num_weeks == weeks)
+        stacked = curve_matrix(curves, names, int(weeks), method)
+        result[rows, :weeks] = total_hours[rows, None] * stacked[codes[rows]]
+    return result
+
+
+# Resample many curves of different lengths in one pass.
+# `values` is a (curves x points) matrix where row i holds `lengths[i]` points and
+# is padded after that; row i is resampled onto `num_weeks[i]` weeks with the same
+# interpolation as resample_curve and normalized to sum to 1. Returns a
+# (curves x max weeks) matrix padded with zeros.
+def resample_rows(values, lengths, num_weeks, method='linear'):
+    values = np.asarray(values, dtype=np.float64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    num_weeks = np.broadcast_to(np.asarray(num_weeks, dtype=np.int64), lengths.shape)
+    if len(lengths) and (lengths.min() <= 0 or num_weeks.min() <= 0):
+        raise ValueError("Curves and week counts must have at least one point.")
+    if method != 'linear':
+        return rebin_cumulative(cumulative_share(values), lengths, num_weeks, method)
+
+    # Position of every new week on the original points, as in np.linspace(0, 1, n)
+    week = np.arange(int(num_weeks.max(initial=0)))
+    steps = np.maximum(num_weeks - 1, 1)[:, None]
+    position = np.minimum(week / steps, 1.0) * (lengths - 1)[:, None]
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, (lengths - 1)[:, None])
+    fraction = position - low
+
+    values = np.nan_to_num(values)
+    curves = (np.take_along_axis(values, low, axis=1) * (1 - fraction)
+              + np.take_along_axis(values, high, axis=1) * fraction)
+    curves[week >= num_weeks[:, None]] = 0.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nan_to_num(curves / curves.sum(axis=1, keepdims=True))
+
+
+# Redistribute a batch of custom curves (e.g. an uploaded file) in one pass.
+# Without `num_weeks` every curve keeps its own length; otherwise it is resampled first.
+def redistribute_custom_batch(values, lengths, total_hours, num_weeks=None, method='linear'):
+    lengths = np.asarray(lengths, dtype=np.int64)
+    total_hours = np.broadcast_to(np.asarray(total_hours, dtype=np.float64), lengths.shape)
+    curves = resample_rows(values, lengths, lengths if num_weeks is None else num_weeks, method)
+    return total_hours[:, None] * curves
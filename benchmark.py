@@ -0,0 +1,218 @@
+"""Reproducible benchmarks for the redistribution code paths.
+
+Times curve scaling for every curve type and week count, batch redistribution
+and exact-sum allocation from 1 to 1M rows, Excel export and chart rendering.
+Results are written as JSON and can be compared against a stored baseline.
+
+Example:
+    python benchmark.py --output baseline.json
+    python benchmark.py --output current.json --baseline baseline.json
+    python benchmark.py --quick -k export
+"""
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from allocation import allocate_exact
+from batch import redistribute_batch, shape_curve
+from curve_registry import registry
+from excel_export import write_xlsx
+from leveling import level_portfolio
+from monte_carlo import simulate_portfolio
+from portfolio import portfolio_load
+from resample import RESAMPLE_METHODS, rebin_cumulative, resample_cache, resample_curve, scale_curve
+
+WEEK_COUNTS = [1, 2, 5, 10, 26, 50, 52, 77, 100, 150, 200]
+BATCH_SIZES = [1, 100, 10_000, 1_000_000]
+QUICK_BATCH_SIZES = [1, 100, 10_000]
+BATCH_WEEKS = 52
+EXPORT_ROWS = 10_000
+PORTFOLIO_JOBS = 2_000
+
+# Fixed inputs so runs are comparable
+_rng = np.random.default_rng(20240101)
+CUSTOM_CURVE = _rng.uniform(0.5, 1.5, 50)
+SCALED_PERCENTAGES = _rng.dirichlet(np.ones(77)) * 100
+
+
+# Time `func` and return per-call statistics in seconds.
+# The number of calls per repeat is chosen so each repeat runs for at least `min_time`.
+def time_call(func, repeats=5, min_time=0.05):
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10
+
+    timings = [elapsed / loops]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - start) / loops)
+    return {"median_s": float(np.median(timings)), "min_s": float(min(timings)), "loops": loops, "repeats": repeats}
+
+
+# Curve functions per curve type: (cached scaling, uncached scaling), each taking the week count
+def curve_cases():
+    cases = {}
+    for name in registry.names:
+        cases[name] = (
+            lambda weeks, name=name: scale_curve(registry[name], registry.points, weeks, key=registry.key(name)),
+            lambda weeks, name=name: resample_curve(registry[name], registry.points, weeks),
+        )
+    for shape in ['linear', 'bell', 'front loaded', 'back loaded']:
+        # Analytic shapes are computed directly, so there is nothing to cache
+        cases[shape] = (lambda weeks, shape=shape: shape_curve(shape, weeks),) * 2
+    custom = lambda weeks: np.resize(CUSTOM_CURVE, weeks) / np.sum(np.resize(CUSTOM_CURVE, weeks))
+    cases['custom'] = (custom, custom)
+    cases['scaled'] = (
+        lambda weeks: scale_curve(SCALED_PERCENTAGES, len(SCALED_PERCENTAGES), weeks),
+        lambda weeks: resample_curve(SCALED_PERCENTAGES, len(SCALED_PERCENTAGES), weeks),
+    )
+    return cases
+
+
+def benchmarks(quick=False):
+    for curve_type, (cached, uncached) in curve_cases().items():
+        for weeks in WEEK_COUNTS:
+            yield f"scale_curve[{curve_type}, weeks={weeks}]", lambda f=cached, w=weeks: f(w)
+            yield f"scale_curve_uncached[{curve_type}, weeks={weeks}]", lambda f=uncached, w=weeks: f(w)
+
+    # Uncached resampling per method, and all registry curves rebinned in one vectorized call
+    for method in RESAMPLE_METHODS:
+        for weeks in WEEK_COUNTS:
+            yield f"resample_curve[{method}, weeks={weeks}]", \
+                lambda m=method, w=weeks: resample_curve(registry['OSM'], registry.points, w, m)
+        if method != 'linear':
+            yield f"rebin_cumulative[{method}, curves={len(registry.values)}, weeks={BATCH_WEEKS}]", \
+                lambda m=method: rebin_cumulative(registry.cumulative, registry.points, BATCH_WEEKS, m)
+
+    shops = np.array(registry.names)
+    for size in QUICK_BATCH_SIZES if quick else BATCH_SIZES:
+        hours = _rng.uniform(10, 5000, size)
+        ids = shops[_rng.integers(0, len(shops), size)]
+        per_row_weeks = _rng.integers(1, 201, size)
+        yield f"redistribute_batch[rows={size}, weeks={BATCH_WEEKS}]", \
+            lambda h=hours, i=ids: redistribute_batch(registry, h, i, BATCH_WEEKS)
+        yield f"redistribute_batch[rows={size}, weeks=1..200]", \
+            lambda h=hours, i=ids, w=per_row_weeks: redistribute_batch(registry, h, i, w)
+        matrix = redistribute_batch(registry, hours, ids, BATCH_WEEKS)
+        yield f"allocate_exact[rows={size}, weeks={BATCH_WEEKS}]", \
+            lambda m=matrix, h=hours: allocate_exact(m, h, 0.25)
+
+    # Stacking a portfolio and leveling it against 70% of each shop's unleveled peak
+    jobs = 500 if quick else PORTFOLIO_JOBS
+    job_shops = shops[_rng.integers(0, len(shops), jobs)]
+    starts, durations = _rng.integers(1, 100, jobs), _rng.integers(10, 80, jobs)
+    job_hours = _rng.uniform(100, 3000, jobs)
+    yield f"portfolio_load[jobs={jobs}]", \
+        lambda: portfolio_load(registry, job_shops, starts, durations, job_hours)
+    load = portfolio_load(registry, job_shops, starts, durations, job_hours)
+    capacity = dict(zip(load.shops, 0.7 * load.load.max(axis=1)))
+    yield f"level_portfolio[greedy, jobs={jobs}]", \
+        lambda: level_portfolio(registry, job_shops, starts, durations, job_hours, capacity)
+    scenarios = 100 if quick else 1_000
+    yield f"simulate_portfolio[jobs={jobs}, scenarios={scenarios}]", \
+        lambda: simulate_portfolio(registry, job_shops, starts, durations, job_hours, scenarios=scenarios, seed=0)
+
+    rows = 1_000 if quick else EXPORT_ROWS
+    matrix = _rng.uniform(0, 100, (rows, BATCH_WEEKS))
+    labels = [np.array([f"Job {i}" for i in range(rows)])]
+    header = ["Job"] + [f"Week {i+1}" for i in range(BATCH_WEEKS)]
+    yield f"excel_export[rows={rows}, weeks={BATCH_WEEKS}]", \
+        lambda: write_xlsx(io.BytesIO(), header, [(labels, matrix)])
+
+    try:
+        import matplotlib  # noqa: F401
+    except ImportError:
+        return
+    from plotting import render_png
+
+    curve = scale_curve(registry['ELE'], registry.points, BATCH_WEEKS, key=registry.key('ELE'))
+    yield f"chart_render[weeks={BATCH_WEEKS}]", lambda: render_png({"ELE Curve": curve})
+    overlay = {name: scale_curve(registry[name], registry.points, 1000, key=registry.key(name))
+               for name in registry.names}
+    yield f"chart_render[{len(overlay)} curves, weeks=1000]", lambda: render_png(overlay)
+
+
+def run(pattern=None, quick=False, repeats=5):
+    results = {}
+    for name, func in benchmarks(quick):
+        if pattern and pattern not in name:
+            continue
+        resample_cache.clear()
+        func()  # Warm up (and fill the resampling cache for the cached variants)
+        results[name] = time_call(func, repeats=repeats)
+        print(f"{results[name]['median_s'] * 1e6:14.1f} us  {name}", file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "curve_set_version": registry.version,
+        },
+        "results": results,
+    }
+
+
+# Compare median timings with a baseline; returns the names that got slower than `tolerance`
+def compare(current, baseline, tolerance):
+    regressions = []
+    print(f"{'baseline':>12} {'current':>12} {'ratio':>7}  benchmark")
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["median_s"]
+        after = result["median_s"]
+        ratio = after / before if before else float('inf')
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            flag = "  faster"
+        print(f"{before * 1e6:10.1f}us {after * 1e6:10.1f}us {ratio:7.2f}  {name}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scale_curve, batch redistribution, export and charts.")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results previously written with --output")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Relative slowdown allowed before a benchmark counts as a regression (default 0.10)")
+    parser.add_argument("-k", dest="pattern", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--quick", action="store_true", help="Skip the 1M-row batch and shrink the export")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    current = run(args.pattern, args.quick, args.repeats)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than the baseline", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
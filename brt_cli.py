@@ -0,0 +1,462 @@
+"""Headless batch mode for the Budget Redistribution Tool.
+
+Reads (job, curve, total hours, weeks) rows from a CSV or Parquet file in chunks,
+redistributes every chunk in one batch and streams the results to CSV, Parquet,
+Arrow IPC (Feather) or xlsx.
+
+Example:
+    python brt_cli.py estimates.csv redistributed.parquet --chunk-size 200000 --workers 8
+    python brt_cli.py estimates.csv redistributed.parquet --quantum 1 --cache-dir ~/.brt_cache
+    python brt_cli.py estimates.csv forecast.parquet --actuals actuals.csv --base last_week.parquet
+"""
+import argparse
+import os
+import sys
+import time
+from contextlib import nullcontext
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from allocation import allocate_exact
+from batch import SHAPE_NAMES, redistribute_batch
+from columnar_export import arrow_table, long_columns, write_parquet
+from curve_registry import registry
+from excel_export import ExcelStreamWriter
+from parallel import ParallelRedistributor
+from reforecast import PortfolioForecast
+from resample import RESAMPLE_METHODS
+from result_cache import DEFAULT_CACHE_BYTES, ResultCache, cached_redistribute
+from work_calendar import WorkCalendar, redistribute_calendar_batch
+
+INPUT_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet'}
+OUTPUT_FORMATS = {
+    '.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.xlsx': 'xlsx',
+    '.feather': 'feather', '.arrow': 'feather',
+}
+
+
+def file_format(path, formats):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in formats:
+        raise ValueError(f"Unsupported file type '{ext}' for {path}. Use one of: {', '.join(sorted(formats))}")
+    return formats[ext]
+
+
+# Yield the input file as DataFrames of at most `chunk_size` rows
+def read_chunks(path, chunk_size, columns):
+    if file_format(path, INPUT_FORMATS) == 'csv':
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+    else:
+        import pyarrow.parquet as pq
+
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield record_batch.to_pandas()
+
+
+# Every sink receives chunks as (labels, value_names, values): `labels` maps column
+# names to 1-D arrays (job, curve, ...) and `values` is a 2-D array whose columns
+# are named by `value_names`. Arrow sinks dictionary-encode the label columns in
+# `dictionaries` (name -> every possible value; see columnar_export.arrow_table).
+
+
+# Appends chunks to a CSV file, writing the header only once
+class CsvSink:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, labels, value_names, values):
+        df = pd.concat([pd.DataFrame(labels), pd.DataFrame(values, columns=value_names)], axis=1)
+        df.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        if self.header:
+            # Nothing was written; still leave an (empty) output file behind
+            open(self.path, 'w').close()
+
+
+# Appends chunks to a Parquet file as row groups, building Arrow columns straight from NumPy
+class ParquetSink:
+    def __init__(self, path, dictionaries=None):
+        self.path = path
+        self.dictionaries = dictionaries
+        self.writer = None
+
+    def write(self, labels, value_names, values):
+        import pyarrow.parquet as pq
+
+        table = arrow_table(labels, value_names, values, self.dictionaries)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# Writes every chunk into a Parquet dataset directory partitioned by one column (e.g. curve=ELE/)
+class PartitionedParquetSink:
+    def __init__(self, path, partition_by, dictionaries=None):
+        self.path = path
+        self.partition_by = partition_by
+        self.dictionaries = dictionaries
+        self.chunks = 0
+
+    def write(self, labels, value_names, values):
+        table = arrow_table(labels, value_names, values, self.dictionaries)
+        write_parquet(table, self.path, self.partition_by, basename_template=f"chunk-{self.chunks:05d}-{{i}}.parquet")
+        self.chunks += 1
+
+    def close(self):
+        pass
+
+
+# Appends chunks to an Arrow IPC (Feather v2) file as record batches
+class FeatherSink:
+    def __init__(self, path, dictionaries=None):
+        self.path = path
+        self.dictionaries = dictionaries
+        self.writer = None
+
+    def write(self, labels, value_names, values):
+        import pyarrow as pa
+
+        table = arrow_table(labels, value_names, values, self.dictionaries)
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = pa.ipc.new_file(self.path, self.schema, options=pa.ipc.IpcWriteOptions(compression='lz4'))
+        self.writer.write_table(table.cast(self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# Streams chunks into a single xlsx sheet in constant memory
+class XlsxSink:
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def write(self, labels, value_names, values):
+        if self.writer is None:
+            self.writer = ExcelStreamWriter(self.path, list(labels) + list(value_names))
+        self.writer.write_block(list(labels.values()), values)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# Passes chunks on to `sink` with their columns renamed by `names` (old -> new)
+class RenamingSink:
+    def __init__(self, sink, names):
+        self.sink = sink
+        self.names = names
+
+    def write(self, labels, value_names, values):
+        labels = {self.names.get(name, name): column for name, column in labels.items()}
+        self.sink.write(labels, [self.names.get(name, name) for name in value_names], values)
+
+    def close(self):
+        self.sink.close()
+
+
+def open_sink(path, partition_by=None, dictionaries=None):
+    output_format = file_format(path, OUTPUT_FORMATS)
+    if partition_by and output_format != 'parquet':
+        raise ValueError("--partition-by-curve is only supported for Parquet output.")
+    if output_format == 'csv':
+        return CsvSink(path)
+    if output_format == 'xlsx':
+        return XlsxSink(path)
+    if output_format == 'feather':
+        return FeatherSink(path, dictionaries)
+    if partition_by:
+        return PartitionedParquetSink(path, partition_by, dictionaries)
+    return ParquetSink(path, dictionaries)
+
+
+# Columns written dictionary-encoded: the curve column, whose values are always
+# registry curves or built-in shapes
+def curve_dictionaries(args):
+    return {args.curve_column: registry.names + list(SHAPE_NAMES)}
+
+
+# Output names of the long layout's job/shop/week/hours columns (see columnar_export.long_columns)
+def long_names(args):
+    return {'job': args.job_column, 'shop': args.curve_column, 'week': 'Week', 'hours': 'Redistributed Hours'}
+
+
+# Redistribute one chunk and lay the result out as a wide (one column per week)
+# or long (one row per job and week) block. With a ResultCache, only rows that are
+# not in the cache yet are redistributed (and rounded).
+def redistribute_chunk(chunk, args, redistribute, cache=None):
+    hours = chunk[args.hours_column].to_numpy(dtype=np.float64)
+    curve_ids = chunk[args.curve_column].astype(str).to_numpy()
+    weeks = chunk[args.weeks_column].to_numpy(dtype=np.int64)
+    jobs = chunk[args.job_column].to_numpy()
+    if len(weeks) and weeks.max() > args.max_weeks:
+        raise ValueError(f"Found a row with {weeks.max()} weeks; raise --max-weeks to at least that.")
+
+    def compute(hours, curve_ids, weeks):
+        matrix = redistribute(hours, curve_ids, weeks)
+        if args.quantum:
+            # Whole hours (or quarter hours, ...) that still add up to each row's budget
+            matrix = allocate_exact(matrix, hours, args.quantum)
+        return matrix
+
+    if cache is None:
+        matrix = compute(hours, curve_ids, weeks)
+    else:
+        matrix = cached_redistribute(cache, registry, hours, curve_ids, weeks, args.resample, compute,
+                                     salt=f"quantum={args.quantum}")
+
+    if args.layout == 'long':
+        # Named job/shop/week/hours like the service's Arrow output; the sink renames them (see long_names)
+        columns = long_columns(matrix, jobs, curve_ids, weeks)
+        hours = columns.pop('hours')
+        return columns, ['hours'], hours[:, None]
+
+    # Pad to a fixed width so every chunk has the same columns
+    padded = np.zeros((len(matrix), args.max_weeks))
+    padded[:, :matrix.shape[1]] = matrix
+    labels = {
+        args.job_column: jobs,
+        args.curve_column: curve_ids,
+        args.hours_column: hours,
+        args.weeks_column: weeks,
+    }
+    return labels, [f"Week {i+1}" for i in range(args.max_weeks)], padded
+
+
+# Calendar mode: redistribute over the working days after each row's start date and
+# lay the result out long, with a real date per row. Rows sharing a start date and
+# week count are redistributed together and reuse the cached working-day index.
+def redistribute_chunk_calendar(chunk, args, calendar):
+    hours = chunk[args.hours_column].to_numpy(dtype=np.float64)
+    curve_ids = chunk[args.curve_column].astype(str).to_numpy()
+    weeks = chunk[args.weeks_column].to_numpy(dtype=np.int64)
+    starts = pd.to_datetime(chunk[args.start_column]).to_numpy().astype('datetime64[D]')
+    jobs = chunk[args.job_column].to_numpy()
+    freq = 'D' if args.daily else 'W'
+
+    job_parts, curve_parts, date_parts, hour_parts = [jobs[:0]], [curve_ids[:0]], [starts[:0]], [hours[:0]]
+    groups = pd.DataFrame({'start': starts, 'weeks': weeks}).groupby(['start', 'weeks'], sort=False).indices
+    for (start, num_weeks), rows in groups.items():
+        periods, matrix = redistribute_calendar_batch(
+            registry, hours[rows], curve_ids[rows], start, num_weeks, calendar, freq, args.resample
+        )
+        if args.quantum:
+            matrix = allocate_exact(matrix, hours[rows], args.quantum)
+        job_parts.append(np.repeat(jobs[rows], len(periods)))
+        curve_parts.append(np.repeat(curve_ids[rows], len(periods)))
+        date_parts.append(np.tile(periods, len(rows)))
+        hour_parts.append(matrix.ravel())
+
+    labels = {
+        args.job_column: np.concatenate(job_parts),
+        args.curve_column: np.concatenate(curve_parts),
+        'Date': np.concatenate(date_parts),
+    }
+    return labels, ['Redistributed Hours'], np.concatenate(hour_parts)[:, None]
+
+
+# Actual hours per (job, week) from a long actuals table, as a (jobs x width) matrix
+# aligned with `jobs`, plus the weeks done of every job (its last booked week)
+def read_actuals(path, args, jobs, width):
+    columns = [args.job_column, args.week_column, args.hours_column]
+    frame = pd.concat(read_chunks(path, args.chunk_size, columns), ignore_index=True)
+    rows = pd.Index(jobs).get_indexer(frame[args.job_column])
+    known = rows >= 0
+    if not known.all():
+        print(f"Ignored actuals of {len(np.unique(frame[args.job_column][~known]))} job(s) not in the input",
+              file=sys.stderr)
+    rows = rows[known]
+    weeks = frame[args.week_column].to_numpy(dtype=np.int64)[known]
+    if len(weeks) and (weeks.min() < 1 or weeks.max() > width):
+        raise ValueError(f"Actuals weeks must be between 1 and {width}.")
+    hours = frame[args.hours_column].to_numpy(dtype=np.float64)[known]
+    actuals = np.bincount(rows * width + weeks - 1, hours, minlength=len(jobs) * width).reshape(len(jobs), width)
+    weeks_done = np.zeros(len(jobs), dtype=np.int64)
+    np.maximum.at(weeks_done, rows, weeks)
+    return actuals, weeks_done
+
+
+# Reforecast mode: spread every job's remaining budget over the weeks after its last
+# booked week. With --base (an earlier reforecast output), rows whose inputs and actuals
+# are unchanged keep their stored forecast; only the other rows are recomputed.
+def run_reforecast(args):
+    columns = [args.job_column, args.curve_column, args.hours_column, args.weeks_column]
+    table = pd.concat(read_chunks(args.input, args.chunk_size, columns), ignore_index=True)
+    jobs = table[args.job_column].to_numpy()
+    if not pd.Index(jobs).is_unique:
+        raise ValueError("Reforecast mode needs one input row per job.")
+    budgets = table[args.hours_column].to_numpy(dtype=np.float64)
+    curve_ids = table[args.curve_column].astype(str).to_numpy()
+    weeks = table[args.weeks_column].to_numpy(dtype=np.int64)
+    if len(weeks) and weeks.max() > args.max_weeks:
+        raise ValueError(f"Found a row with {weeks.max()} weeks; raise --max-weeks to at least that.")
+    week_names = [f"Week {i+1}" for i in range(args.max_weeks)]
+
+    start = time.perf_counter()
+    hours, weeks_done, reuse = None, None, np.zeros(len(jobs), dtype=bool)
+    if args.base:
+        base = pd.concat(read_chunks(args.base, args.chunk_size, None), ignore_index=True)
+        stored = pd.Index(base[args.job_column]).get_indexer(jobs)
+        found = stored >= 0
+        stored = np.where(found, stored, 0)
+        # A stored row is only reused when the job's budget, curve and duration are unchanged
+        reuse = (found & (base[args.hours_column].to_numpy(dtype=np.float64)[stored] == budgets)
+                 & (base[args.curve_column].astype(str).to_numpy()[stored] == curve_ids)
+                 & (base[args.weeks_column].to_numpy(dtype=np.int64)[stored] == weeks))
+        hours = np.zeros((len(jobs), args.max_weeks))
+        base_hours = base.reindex(columns=week_names, fill_value=0.0).to_numpy(dtype=np.float64)
+        hours[reuse] = base_hours[stored[reuse]]
+        fresh = np.flatnonzero(~reuse)
+        if len(fresh):
+            matrix = redistribute_batch(registry, budgets[fresh], curve_ids[fresh], weeks[fresh], args.resample)
+            hours[fresh, :matrix.shape[1]] = matrix
+        weeks_done = np.where(reuse, base['Weeks Done'].to_numpy(dtype=np.int64)[stored], 0)
+    forecast = PortfolioForecast(registry, budgets, curve_ids, weeks, hours=hours, weeks_done=weeks_done,
+                                 method=args.resample)
+
+    actuals, actual_weeks = read_actuals(args.actuals, args, jobs, forecast.hours.shape[1])
+    rows = forecast.changed_rows(actuals, actual_weeks)
+    forecast.update_actuals(rows, actuals[rows], actual_weeks[rows])
+    unspent = forecast.unspent()
+
+    padded = np.zeros((len(jobs), args.max_weeks))
+    padded[:, :forecast.hours.shape[1]] = forecast.hours
+    sink = open_sink(args.output, dictionaries=curve_dictionaries(args))
+    try:
+        for first in range(0, len(jobs), args.chunk_size):
+            block = slice(first, first + args.chunk_size)
+            labels = {
+                args.job_column: jobs[block],
+                args.curve_column: curve_ids[block],
+                args.hours_column: budgets[block],
+                args.weeks_column: weeks[block],
+                'Weeks Done': forecast.weeks_done[block],
+                'Unspent Hours': unspent[block],
+            }
+            sink.write(labels, week_names, padded[block])
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Re-forecast {len(rows)} of {len(jobs)} jobs ({int(reuse.sum())} reused from --base) in {elapsed:.2f}s; "
+          f"{unspent.sum():,.1f} hours left unspent by finished jobs", file=sys.stderr)
+    return len(jobs)
+
+
+def run(args):
+    columns = [args.job_column, args.curve_column, args.hours_column, args.weeks_column]
+    if args.start_column:
+        columns.append(args.start_column)
+        calendar = WorkCalendar.from_file(args.calendar) if args.calendar else WorkCalendar()
+    if args.workers > 1:
+        pool = ParallelRedistributor(registry, workers=args.workers, method=args.resample)
+        redistribute = pool.redistribute
+    else:
+        pool = nullcontext()
+        redistribute = partial(redistribute_batch, registry, method=args.resample)
+    cache = ResultCache(args.cache_dir, args.cache_size * 1024**2) if args.cache_dir else None
+
+    sink = open_sink(args.output, args.curve_column if args.partition_by_curve else None, curve_dictionaries(args))
+    if args.layout == 'long' and not args.start_column:
+        sink = RenamingSink(sink, long_names(args))
+    total_rows = 0
+    start = time.perf_counter()
+    try:
+        with pool:
+            for chunk in read_chunks(args.input, args.chunk_size, columns):
+                chunk_start = time.perf_counter()
+                if args.start_column:
+                    sink.write(*redistribute_chunk_calendar(chunk, args, calendar))
+                else:
+                    sink.write(*redistribute_chunk(chunk, args, redistribute, cache))
+                total_rows += len(chunk)
+                if not args.quiet:
+                    elapsed = time.perf_counter() - chunk_start
+                    print(f"{total_rows} rows done ({len(chunk) / max(elapsed, 1e-9):,.0f} rows/sec)", file=sys.stderr)
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Redistributed {total_rows} rows in {elapsed:.2f}s ({total_rows / max(elapsed, 1e-9):,.0f} rows/sec)", file=sys.stderr)
+    if cache is not None:
+        print(f"Result cache: {cache.hits} rows reused, {cache.misses} computed "
+              f"({cache.size_bytes / 1024**2:,.0f} MB in {args.cache_dir})", file=sys.stderr)
+    return total_rows
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Redistribute hours for a whole portfolio file without the GUI.")
+    parser.add_argument("input", help="Input .csv or .parquet file with one row per (job, curve)")
+    parser.add_argument("output", help="Output .csv, .parquet, .feather/.arrow or .xlsx file")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows read and redistributed per chunk")
+    parser.add_argument("--layout", choices=['wide', 'long'], default='wide',
+                        help="wide: one column per week; long: one row per job and week")
+    parser.add_argument("--max-weeks", type=int, default=200, help="Number of week columns in the wide layout")
+    parser.add_argument("--partition-by-curve", action="store_true",
+                        help="Write Parquet output as a directory partitioned by shop/curve")
+    parser.add_argument("--job-column", default="job")
+    parser.add_argument("--curve-column", default="curve", help="Column holding the shop code or curve name")
+    parser.add_argument("--hours-column", default="hours")
+    parser.add_argument("--weeks-column", default="weeks")
+    parser.add_argument("--resample", choices=RESAMPLE_METHODS, default='linear',
+                        help="How curves are stretched to each week count: linear point interpolation, or "
+                             "area/pchip rebinning that keeps every phase's share of hours")
+    parser.add_argument("--quantum", type=float,
+                        help="Round weekly hours to multiples of this (e.g. 1 or 0.25) while keeping each row's total exact")
+    parser.add_argument("--start-column",
+                        help="Column with each job's start date; enables calendar mode (long layout with real dates)")
+    parser.add_argument("--calendar",
+                        help="Holiday/shutdown file for calendar mode: one date per line or 'first,last' per shutdown")
+    parser.add_argument("--daily", action="store_true", help="In calendar mode, output one row per working day")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes to redistribute with (default 1, i.e. no process pool; "
+                             "not used in calendar mode)")
+    parser.add_argument("--actuals",
+                        help="Reforecast mode: long table of actual hours booked per job (job, week, hours "
+                             "columns); each job's remaining budget is spread over the weeks after its last booked week")
+    parser.add_argument("--week-column", default="week", help="Week number column of the --actuals table")
+    parser.add_argument("--base",
+                        help="Reforecast mode: an earlier reforecast output (.csv or .parquet); jobs whose inputs and actuals "
+                             "are unchanged keep their stored forecast instead of being recomputed")
+    parser.add_argument("--cache-dir",
+                        help="Directory of a persistent result cache; rows redistributed by an earlier run with the "
+                             "same curve, hours, weeks and options are reused (not used in calendar mode)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_BYTES // 1024**2,
+                        help="Size limit of the result cache in MB; least recently used entries are deleted first")
+    parser.add_argument("--quiet", action="store_true", help="Only report the final throughput")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.chunk_size <= 0:
+        raise SystemExit("--chunk-size must be greater than 0.")
+    if args.cache_dir and args.start_column:
+        raise SystemExit("--cache-dir cannot be combined with calendar mode (--start-column).")
+    if args.workers > 1 and args.start_column:
+        raise SystemExit("--workers cannot be combined with calendar mode (--start-column).")
+    if args.base and not args.actuals:
+        raise SystemExit("--base is only used in reforecast mode (--actuals).")
+    if args.actuals and (args.start_column or args.cache_dir or args.quantum or args.layout != 'wide'
+                         or args.partition_by_curve):
+        raise SystemExit("Reforecast mode (--actuals) writes the wide layout and cannot be combined with "
+                         "--start-column, --cache-dir, --quantum, --layout long or --partition-by-curve.")
+    try:
+        run_reforecast(args) if args.actuals else run(args)
+    except (ValueError, KeyError) as e:
+        raise SystemExit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
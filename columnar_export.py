@@ -0,0 +1,78 @@
+"""Parquet and Arrow IPC (Feather) output built directly from redistributed NumPy arrays.
+
+Hours columns are handed to Arrow without copying where the memory layout allows
+it, weeks are stored as integers rather than "Week i" strings, and shop/curve
+codes are dictionary-encoded.
+"""
+import numpy as np
+
+
+def _pa():
+    import pyarrow as pa  # Optional dependency, only needed for columnar output
+
+    return pa
+
+
+# Arrow table from label columns (name -> 1-D array) and a 2-D array of value columns.
+# Label columns named in `dictionaries` are dictionary-encoded (see dictionary_array).
+def arrow_table(labels, value_names, values, dictionaries=None):
+    pa = _pa()
+    dictionaries = dictionaries or {}
+    columns = {
+        name: dictionary_array(column, dictionaries[name]) if name in dictionaries else pa.array(np.asarray(column))
+        for name, column in labels.items()
+    }
+    # Each value column becomes a contiguous slice of the transposed array, which Arrow wraps without copying
+    by_column = np.ascontiguousarray(np.asarray(values, dtype=np.float64).T)
+    columns.update((name, pa.array(by_column[i])) for i, name in enumerate(value_names))
+    return pa.table(columns)
+
+
+# Dictionary-encoded string column. With `categories` the dictionary is that fixed set
+# of values, so every chunk written to one Arrow IPC file shares it (IPC files allow only
+# one dictionary per column); without it the dictionary is built from `values`.
+def dictionary_array(values, categories=None):
+    pa = _pa()
+    values = np.asarray(values).astype(str)
+    if categories is None:
+        return pa.array(values).dictionary_encode()
+    categories = np.unique(np.asarray(categories).astype(str))
+    codes = np.minimum(np.searchsorted(categories, values), max(len(categories) - 1, 0))
+    if len(values) and (not len(categories) or np.any(categories[codes] != values)):
+        raise ValueError("Found a value that is not in the column's dictionary.")
+    return pa.DictionaryArray.from_arrays(pa.array(codes.astype(np.int32)), pa.array(categories))
+
+
+# Long layout as NumPy columns (job, shop, week, hours): one row per (job, shop, week)
+# with an int16 week number. Weeks beyond a row's `num_weeks` (padding of per-row week
+# counts) are left out.
+def long_columns(hours, jobs, shops, num_weeks=None):
+    hours = np.asarray(hours, dtype=np.float64)
+    rows, width = hours.shape
+    num_weeks = np.broadcast_to(np.asarray(width if num_weeks is None else num_weeks, dtype=np.int64), (rows,))
+    mask = np.arange(width) < num_weeks[:, None]
+    return {
+        'job': np.repeat(np.asarray(jobs), num_weeks),
+        'shop': np.repeat(np.asarray(shops), num_weeks),
+        'week': np.broadcast_to(np.arange(1, width + 1, dtype=np.int16), hours.shape)[mask],
+        'hours': hours[mask],
+    }
+
+
+# Long layout as an Arrow table, with the shop column dictionary-encoded
+def long_table(hours, jobs, shops, num_weeks=None):
+    columns = long_columns(hours, jobs, shops, num_weeks)
+    hours = columns.pop('hours')
+    return arrow_table(columns, ['hours'], hours[:, None], {'shop': None})
+
+
+# Write a table to Parquet; with `partition_by` the output is a directory with one
+# sub-directory per value of that column (e.g. shop=ELE/). `basename_template` names
+# the files written into it, so repeated writes to one dataset do not overwrite each other.
+def write_parquet(table, path, partition_by=None, basename_template=None):
+    import pyarrow.parquet as pq
+
+    if partition_by:
+        pq.write_to_dataset(table, path, partition_cols=[partition_by], basename_template=basename_template)
+    else:
+        pq.write_table(table, path)
@@ -0,0 +1,193 @@
+"""Derive shop curves from historical timesheet data.
+
+Streams a (job, shop, week, hours) timesheet export from CSV or Parquet in chunks
+and builds one curve per shop:
+
+1. First pass: the first and last booked week and the total hours of every
+   (job, shop) pair, combined chunk by chunk.
+2. Second pass: every job/shop is stretched onto a 0-1 timeline and its share of
+   hours is spread over `--points` equal bins. Each booked week covers an interval
+   of the timeline, and its hours are split over the bins that interval overlaps,
+   so short jobs do not leave gaps in the curve.
+
+By default every job counts equally (`--weighting job`); with `--weighting hours`
+large jobs weigh in proportion to their hours. The result is written as a
+versioned curve set that the apps load with the BRT_CURVES environment variable.
+
+Example:
+    python curve_builder.py timesheets.parquet data/shop_curves_2026.json --points 50 --min-jobs 20
+    BRT_CURVES=data/shop_curves_2026.json streamlit run app.py
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from brt_cli import read_chunks
+from curve_registry import CurveRegistry, load_registry
+from resample import rebin_cumulative
+
+
+# Week numbers of a chunk; date columns are turned into Monday-to-Sunday week numbers
+# like work_calendar's weeks. Epoch day 0 (1970-01-01) was a Thursday, so days are
+# shifted by 3 to put every week boundary on a Monday.
+def week_numbers(column):
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype=np.int64)
+    days = pd.to_datetime(column).to_numpy().astype('datetime64[D]').astype(np.int64)
+    return (days + 3) // 7
+
+
+# (jobs, shops, weeks, hours) of a chunk, without rows that book no hours
+def chunk_arrays(chunk, args):
+    hours = chunk[args.hours_column].to_numpy(dtype=np.float64)
+    booked = hours != 0
+    chunk = chunk[booked]
+    return (
+        chunk[args.job_column].to_numpy(),
+        chunk[args.shop_column].astype(str).to_numpy(),
+        week_numbers(chunk[args.week_column]),
+        hours[booked],
+    )
+
+
+# First pass: first week, last week and total hours of every (job, shop)
+def job_spans(args, columns):
+    spans = None
+    for chunk in read_chunks(args.input, args.chunk_size, columns):
+        jobs, shops, weeks, hours = chunk_arrays(chunk, args)
+        part = pd.DataFrame({'job': jobs, 'shop': shops, 'first': weeks, 'last': weeks, 'total': hours})
+        part = part.groupby(['job', 'shop']).agg({'first': 'min', 'last': 'max', 'total': 'sum'})
+        if spans is not None:
+            part = pd.concat([spans, part]).groupby(level=[0, 1]).agg({'first': 'min', 'last': 'max', 'total': 'sum'})
+        spans = part
+    if spans is None:
+        raise ValueError(f"No timesheet rows found in {args.input}.")
+    # Jobs whose bookings net out to nothing have no shape to contribute
+    return spans[spans['total'] > 0]
+
+
+# Mass of every row in each of `points` bins, as (rows x points).
+# A row covers [start, end) in bin units and its mass is spread evenly over that interval.
+def bin_mass(start, end, mass, points):
+    edges = np.arange(points + 1, dtype=np.float64)
+    covered = np.clip((edges - start[:, None]) / (end - start)[:, None], 0.0, 1.0)
+    return np.diff(covered, axis=1) * mass[:, None]
+
+
+# Second pass: sum of every shop's normalized job timelines, binned into `points` bins
+def bin_timesheets(args, columns, spans):
+    shop_names = np.unique(spans.index.get_level_values('shop').to_numpy().astype(str))
+    sums = np.zeros((len(shop_names), args.points))
+    for chunk in read_chunks(args.input, args.chunk_size, columns):
+        jobs, shops, weeks, hours = chunk_arrays(chunk, args)
+        span = spans.index.get_indexer(pd.MultiIndex.from_arrays([jobs, shops]))
+        known = span >= 0
+        span, shops, weeks, hours = span[known], shops[known], weeks[known], hours[known]
+        if len(span) == 0:
+            continue
+
+        first = spans['first'].to_numpy()[span]
+        length = spans['last'].to_numpy()[span] - first + 1
+        mass = hours / spans['total'].to_numpy()[span] if args.weighting == 'job' else hours
+        scale = args.points / length
+        offset = (weeks - first) * scale
+        binned = bin_mass(offset, offset + scale, mass, args.points)
+
+        # Rows grouped by shop, then one reduceat per shop block
+        shop_codes = np.searchsorted(shop_names, shops)
+        order = np.argsort(shop_codes, kind='stable')
+        codes, block_start = np.unique(shop_codes[order], return_index=True)
+        sums[codes] += np.add.reduceat(binned[order], block_start, axis=0)
+        if not args.quiet:
+            print(f"Binned {len(span)} rows", file=sys.stderr)
+    return shop_names, sums
+
+
+# Build {shop: percentages} from a timesheet file, plus the number of jobs behind each curve
+def build_curves(args):
+    columns = [args.job_column, args.shop_column, args.week_column, args.hours_column]
+    spans = job_spans(args, columns)
+    shop_names, sums = bin_timesheets(args, columns, spans)
+    job_counts = spans.groupby(level='shop').size()
+
+    curves, counts = {}, {}
+    for shop, values in zip(shop_names, sums):
+        values = np.maximum(values, 0.0)  # Net negative corrections cannot make a bin negative
+        if job_counts[shop] < args.min_jobs:
+            print(f"Skipping {shop}: {job_counts[shop]} job(s), fewer than --min-jobs {args.min_jobs}", file=sys.stderr)
+            continue
+        if values.sum() <= 0:
+            print(f"Skipping {shop}: its booked hours do not add up to more than 0", file=sys.stderr)
+            continue
+        curves[shop] = 100 * values / values.sum()
+        counts[shop] = int(job_counts[shop])
+    return curves, counts
+
+
+def run(args):
+    start = time.perf_counter()
+    curves, counts = build_curves(args)
+
+    base = load_registry(args.base) if (args.keep_missing or args.version is None) else None
+    if args.keep_missing:
+        # Kept curves are rebinned onto --points when the base set has a different number
+        # of points; area rebinning keeps every phase's share of hours
+        for name in base:
+            if name not in curves:
+                row = base.row(name)
+                curves[name] = (base.values[row] if base.points == args.points
+                                else 100 * rebin_cumulative(base.cumulative[row], base.points, args.points)[0])
+    if not curves:
+        raise ValueError("No curves could be derived; check the column names and --min-jobs.")
+
+    version = args.version
+    if version is None:
+        version = base.version + 1 if isinstance(base.version, int) else 1
+    registry = CurveRegistry(curves, version=version)
+    description = args.description or (
+        f"Shop curves derived from {args.input}: percentages over a {args.points}-point timeline"
+    )
+    registry.to_file(args.output, description=description, extra={'jobs': counts})
+
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {len(curves)} curve(s), version {version}, to {args.output} in {elapsed:.2f}s", file=sys.stderr)
+    return registry
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Derive shop curves from historical timesheet data.")
+    parser.add_argument("input", help="Timesheet .csv or .parquet file with one row per (job, shop, week)")
+    parser.add_argument("output", help="Curve set .json file to write")
+    parser.add_argument("--points", type=int, default=50, help="Number of points per curve")
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="Timesheet rows read per chunk")
+    parser.add_argument("--weighting", choices=['job', 'hours'], default='job',
+                        help="job: every job counts equally; hours: jobs count in proportion to their hours")
+    parser.add_argument("--min-jobs", type=int, default=1, help="Leave out shops with fewer jobs than this")
+    parser.add_argument("--keep-missing", action="store_true",
+                        help="Copy curves the timesheets do not cover from the base curve set")
+    parser.add_argument("--base", help="Base curve set for --keep-missing and versioning (default: the current one)")
+    parser.add_argument("--version", type=int, help="Version of the new curve set (default: base version + 1)")
+    parser.add_argument("--description", help="Description stored in the curve set")
+    parser.add_argument("--job-column", default="job")
+    parser.add_argument("--shop-column", default="shop")
+    parser.add_argument("--week-column", default="week", help="Week number, or a date within the week")
+    parser.add_argument("--hours-column", default="hours")
+    parser.add_argument("--quiet", action="store_true", help="Only report the result")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.chunk_size <= 0 or args.points <= 0:
+        raise SystemExit("--chunk-size and --points must be greater than 0.")
+    try:
+        run(args)
+    except (ValueError, KeyError) as e:
+        raise SystemExit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import json
+import os
+from collections.abc import Mapping
+
+import numpy as np
+
+from resample import curve_key
+
+# Curve set loaded by default; set BRT_CURVES to a different file to use another curve set
+DEFAULT_CURVE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "shop_curves.json")
+
+
+# Shop curves stored as one contiguous 2-D float64 array with a name -> row index.
+#
+# Identical curves (e.g. LAG and PNT) share a single row. Normalized curves and
+# their cumulative sums are computed once when the registry is built. The registry
+# behaves like a read-only dict of name -> normalized curve, so it can be used
+# wherever the old `normalized_curves` dict was.
+class CurveRegistry(Mapping):
+    def __init__(self, curves, version=None):
+        self.names = list(curves)
+        values = [np.asarray(curves[name], dtype=np.float64) for name in self.names]
+        if len({len(v) for v in values}) > 1:
+            raise ValueError("All curves in a curve set must have the same number of points.")
+        if any(v.sum() <= 0 for v in values):
+            raise ValueError("Every curve must have a positive sum.")
+
+        # Deduplicate identical curves, keeping rows in first-seen order
+        rows = {}
+        unique_values = []
+        self.index = {}
+        for name, v in zip(self.names, values):
+            if v.tobytes() not in rows:
+                rows[v.tobytes()] = len(unique_values)
+                unique_values.append(v)
+            self.index[name] = rows[v.tobytes()]
+        self.points = len(values[0]) if values else 0
+        self.values = np.array(unique_values, dtype=np.float64).reshape(len(unique_values), self.points)
+        self.version = version
+
+        self.normalized = self.values / self.values.sum(axis=1, keepdims=True)
+        # Cumulative share of hours at each point boundary, starting at 0 and ending at 1
+        self.cumulative = np.zeros((len(unique_values), self.points + 1))
+        np.cumsum(self.normalized, axis=1, out=self.cumulative[:, 1:])
+        for array in (self.values, self.normalized, self.cumulative):
+            array.setflags(write=False)
+        # Content hash of every row, used as its resampling cache key, so two curve sets
+        # that reuse a name for a different curve never share cached results
+        self.keys = [curve_key(row) for row in self.normalized]
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if "curves" not in data:
+            raise ValueError(f"{path} is not a curve set file (no 'curves' entry).")
+        return cls(data["curves"], version=data.get("version"))
+
+    # `extra` holds additional top-level entries (e.g. how a curve set was derived)
+    def to_file(self, path, description=None, extra=None):
+        data = {"version": self.version}
+        if description:
+            data["description"] = description
+        data.update(extra or {})
+        data["curves"] = {name: [round(float(p), 4) for p in self.values[self.index[name]]] for name in self.names}
+        with open(path, "w") as f:
+            json.dump(data, f, indent=4)
+
+    # Row of `name` in the curve arrays
+    def row(self, name):
+        return self.index[name]
+
+    # Resampling cache key of `name` (see resample.scale_curve)
+    def key(self, name):
+        return self.keys[self.index[name]]
+
+    def __getitem__(self, name):
+        return self.normalized[self.index[name]]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+def load_registry(path=None):
+    return CurveRegistry.from_file(path or os.environ.get("BRT_CURVES") or DEFAULT_CURVE_FILE)
+
+
+registry = load_registry()
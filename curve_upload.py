@@ -0,0 +1,119 @@
+import io
+import os
+import re
+
+import numpy as np
+
+from batch import redistribute_custom_batch
+from result import RedistributionResult
+
+# Optional per-curve columns of an uploaded curve table; every other column holds curve values
+NAME_COLUMN = 'name'
+HOURS_COLUMN = 'total_hours'
+WEEKS_COLUMN = 'num_weeks'
+
+# Allowed difference between the sum of uploaded percentages and 100
+PERCENT_TOLERANCE = 1e-6
+
+
+# Parse pasted values ("0.1, 0.2, 0.3" or one value per line, as copied from a spreadsheet)
+def parse_values(text):
+    parts = [part for part in re.split(r"[,;\s]+", text.strip()) if part]
+    if not parts:
+        raise ValueError("No values entered.")
+    try:
+        return np.array(parts, dtype=np.float64)
+    except ValueError:
+        raise ValueError("Invalid input. Ensure all values are numbers separated by commas.")
+
+
+# Read an uploaded curve table (CSV or xlsx) into a DataFrame.
+# `data` is a path, bytes or a file-like object; `filename` picks the reader.
+def read_curve_table(data, filename=None):
+    import pandas as pd
+
+    filename = filename or (data if isinstance(data, str) else "")
+    if isinstance(data, bytes):
+        data = io.BytesIO(data)
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.csv':
+        return pd.read_csv(data)
+    if ext in ('.xlsx', '.xlsm'):
+        return pd.read_excel(data)
+    raise ValueError(f"Unsupported file type '{ext}'. Upload a .csv or .xlsx file.")
+
+
+# Many custom curves parsed from one table, with every row validated at once.
+#
+# Each row of the table is one curve: an optional name, total hours and number of
+# weeks, followed by its values in the remaining columns. Curves may have different
+# lengths; shorter rows leave their trailing cells empty. `values` is the
+# (curves x longest curve) matrix padded with NaN, `lengths` the number of values of
+# each curve and `errors` holds a message for every invalid row ('' when valid).
+# With `percentages=True` each curve must sum to 100, like the fitted/scaled curves.
+class CurveTable:
+    def __init__(self, table, percentages=False):
+        import pandas as pd
+
+        columns = {str(c).strip().lower(): c for c in table.columns}
+        rows = len(table)
+        self.names = (table[columns[NAME_COLUMN]].astype(str).to_numpy() if NAME_COLUMN in columns
+                      else np.array([f"Curve {i+1}" for i in range(rows)], dtype=object))
+        self.total_hours = (pd.to_numeric(table[columns[HOURS_COLUMN]], errors='coerce').to_numpy(dtype=np.float64)
+                            if HOURS_COLUMN in columns else np.full(rows, np.nan))
+        self.num_weeks = (pd.to_numeric(table[columns[WEEKS_COLUMN]], errors='coerce').to_numpy(dtype=np.float64)
+                          if WEEKS_COLUMN in columns else np.full(rows, np.nan))
+
+        raw = table.drop(columns=[columns[c] for c in (NAME_COLUMN, HOURS_COLUMN, WEEKS_COLUMN) if c in columns])
+        numeric = raw.apply(pd.to_numeric, errors='coerce')
+        self.values = numeric.to_numpy(dtype=np.float64).reshape(rows, raw.shape[1])
+        present = ~np.isnan(self.values)
+        self.lengths = present.sum(axis=1)
+        sums = np.nansum(self.values, axis=1)
+
+        # Checks in order of priority; a row reports the first one it fails
+        checks = [
+            ((raw.notna().to_numpy() & ~present).any(axis=1), "contains values that are not numbers"),
+            (self.lengths == 0, "has no values"),
+            ((present[:, 1:] & ~present[:, :-1]).any(axis=1), "has empty cells between values"),
+            ((np.nan_to_num(self.values) < 0).any(axis=1), "has negative values"),
+            (sums <= 0, "values must sum to more than 0"),
+            (self.total_hours < 0, "has negative total hours"),
+            (np.nan_to_num(self.num_weeks, nan=1) < 1, "must have at least 1 week"),
+            (~np.isnan(self.num_weeks) & (self.num_weeks != np.floor(self.num_weeks)),
+             "week count must be a whole number"),
+        ]
+        if percentages:
+            checks.append((np.abs(sums - 100) > PERCENT_TOLERANCE, "percentages must sum to 100"))
+        self.errors = np.full(rows, "", dtype=object)
+        for mask, message in reversed(checks):
+            self.errors[mask] = message
+
+    @property
+    def valid(self):
+        return self.errors == ""
+
+    def __len__(self):
+        return len(self.values)
+
+    # (row number, name, message) of every invalid row, numbered like the spreadsheet
+    # (the header is row 1, so the first curve is row 2)
+    def problems(self):
+        rows = np.flatnonzero(~self.valid)
+        return [(int(row) + 2, self.names[row], self.errors[row]) for row in rows]
+
+    # Redistribute every valid curve in one pass.
+    # Rows without their own total hours or week count use `total_hours` and `num_weeks`;
+    # without a week count at all a curve keeps its own length.
+    def redistribute(self, total_hours, num_weeks=None):
+        valid = self.valid
+        lengths = self.lengths[valid]
+        hours = np.where(np.isnan(self.total_hours[valid]), total_hours, self.total_hours[valid])
+        default_weeks = lengths if num_weeks is None else num_weeks
+        weeks = np.where(np.isnan(self.num_weeks[valid]), default_weeks, self.num_weeks[valid]).astype(np.int64)
+        matrix = redistribute_custom_batch(self.values[valid], lengths, hours, weeks)
+        return RedistributionResult(matrix, "custom", jobs=self.names[valid], num_weeks=weeks)
+
+
+def load_curve_table(data, filename=None, percentages=False):
+    return CurveTable(read_curve_table(data, filename), percentages=percentages)
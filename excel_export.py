@@ -0,0 +1,53 @@
+import numpy as np
+
+# Largest number of rows (including the header) a single worksheet can hold
+EXCEL_MAX_ROWS = 1_048_576
+
+
+# Writes an xlsx sheet row by row in xlsxwriter's constant-memory mode.
+# Data is handed over as blocks of NumPy rows, so no DataFrame is ever built and
+# memory use stays flat no matter how many rows are written.
+#
+# Each block is `(labels, values)`: `labels` is a sequence of 1-D columns written
+# first (job, shop, week label, ...), `values` a 2-D numeric array (or a 1-D array
+# for a single column) written after them.
+class ExcelStreamWriter:
+    def __init__(self, target, header, sheet_name="Redistribution"):
+        import xlsxwriter  # Only needed once something is exported
+
+        self.workbook = xlsxwriter.Workbook(target, {'constant_memory': True, 'nan_inf_to_errors': True})
+        self.worksheet = self.workbook.add_worksheet(sheet_name)
+        self.worksheet.write_row(0, 0, list(header))
+        self.row = 1
+
+    def write_block(self, labels, values):
+        values = np.asarray(values)
+        if values.ndim == 1:
+            values = values[:, None]
+        if self.row + len(values) > EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel sheets are limited to {EXCEL_MAX_ROWS - 1} data rows; use CSV or Parquet instead.")
+
+        label_rows = list(zip(*[np.asarray(column).tolist() for column in labels])) if labels else None
+        offset = len(labels)
+        for i, value_row in enumerate(values.tolist()):
+            if label_rows is not None:
+                self.worksheet.write_row(self.row, 0, label_rows[i])
+            self.worksheet.write_row(self.row, offset, value_row)
+            self.row += 1
+
+    def close(self):
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Write a whole sheet from an iterable of (labels, values) blocks to a path or file object
+def write_xlsx(target, header, blocks, sheet_name="Redistribution"):
+    with ExcelStreamWriter(target, header, sheet_name) as writer:
+        for labels, values in blocks:
+            writer.write_block(labels, values)
+        return writer.row - 1
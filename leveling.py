@@ -0,0 +1,261 @@
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from batch import curve_matrix
+from portfolio import _scatter, stack_load
+
+# Duration factors a job may be stretched by while leveling (1.0 = keep its duration)
+DEFAULT_STRETCH = (1.0, 1.25, 1.5)
+# Costs within this many hours of the best are treated as equal, so the least disruptive option wins
+COST_TOLERANCE = 1e-6
+# LP cost of every week a job is moved or stretched, in hours of overload; keeps jobs
+# where they are unless moving them actually removes overload
+LP_CHANGE_COST = 1e-3
+
+LEVELING_SOLVERS = ('greedy', 'lp')
+
+
+# Hours above capacity: `load` is (shops x weeks), `capacity` holds one weekly limit per shop
+def overload(load, capacity):
+    return float(np.maximum(load - np.asarray(capacity, dtype=np.float64)[:, None], 0.0).sum())
+
+
+# Outcome of leveling a portfolio: the new start week and duration of every job, the
+# shop load before and after, and how long the solver took.
+class LevelingResult:
+    def __init__(self, before, after, capacity, start_weeks, num_weeks, new_start_weeks, new_num_weeks,
+                 solver, solve_seconds):
+        self.before = before
+        self.after = after
+        self.capacity = capacity
+        self.start_weeks = start_weeks
+        self.num_weeks = num_weeks
+        self.new_start_weeks = new_start_weeks
+        self.new_num_weeks = new_num_weeks
+        self.solver = solver
+        self.solve_seconds = solve_seconds
+
+    @property
+    def overload_before(self):
+        return overload(self.before.load, self.capacity)
+
+    @property
+    def overload_after(self):
+        return overload(self.after.load, self.capacity)
+
+    # Rows of the jobs that were moved or stretched
+    def changed(self):
+        return np.flatnonzero((self.new_start_weeks != self.start_weeks) | (self.new_num_weeks != self.num_weeks))
+
+    def summary(self):
+        return (f"Overload {self.overload_before:,.0f} -> {self.overload_after:,.0f} hours; "
+                f"{len(self.changed())} job(s) moved or stretched ({self.solver}, {self.solve_seconds:.2f}s)")
+
+    # Per-job plan: original and leveled start week and duration
+    def plan_frame(self, jobs=None, shops=None):
+        import pandas as pd
+
+        frame = pd.DataFrame({
+            'Start Week': self.start_weeks, 'Weeks': self.num_weeks,
+            'Leveled Start Week': self.new_start_weeks, 'Leveled Weeks': self.new_num_weeks,
+        })
+        if shops is not None:
+            frame.insert(0, 'Shop', shops)
+        if jobs is not None:
+            frame.insert(0, 'Job', jobs)
+        return frame
+
+
+# The options of one job, least disruptive first: durations from the original one up,
+# and shifts (relative to the original start) from the smallest up
+def _options(num_weeks, max_delay, max_advance, stretch):
+    durations = sorted({max(int(round(num_weeks * factor)), 1) for factor in stretch} | {num_weeks})
+    durations = [d for d in durations if d >= num_weeks]
+    shifts = np.arange(-max_advance, max_delay + 1)
+    return durations, shifts[np.argsort(np.abs(shifts), kind='stable')]
+
+
+class _Portfolio:
+    # Jobs on one timeline wide enough for every allowed shift and stretch
+    def __init__(self, curves, shops, start_weeks, num_weeks, total_hours, max_delay, max_advance, stretch, method):
+        self.curves, self.method = curves, method
+        self.shops, self.num_weeks, self.total_hours = shops, num_weeks, total_hours
+        self.max_delay, self.max_advance, self.stretch = max_delay, max_advance, stretch
+        self.shop_names, self.shop_codes = np.unique(shops, return_inverse=True)
+        self.first_week = int(start_weeks.min(initial=1)) - max_advance
+        longest = np.ceil(num_weeks * max(max(stretch), 1.0)).astype(np.int64)
+        self.width = int((start_weeks + max_delay + longest).max(initial=self.first_week)) - self.first_week + 1
+        self.offsets = start_weeks - self.first_week
+        self._units = {}
+
+    # Curves of every shop spread over `weeks` weeks, one row per shop code; built with
+    # one curve_matrix call the first time a duration is needed, then reused
+    def units(self, weeks):
+        weeks = int(weeks)
+        if weeks not in self._units:
+            self._units[weeks] = curve_matrix(self.curves, self.shop_names, weeks, self.method)
+        return self._units[weeks]
+
+    # Hours per week of job i spread over `weeks` weeks
+    def profile(self, i, weeks):
+        return self.total_hours[i] * self.units(weeks)[self.shop_codes[i]]
+
+    # Hours per week of every job (jobs x longest, padded with zeros), one block per duration
+    def hours(self, weeks):
+        hours = np.zeros((len(weeks), int(weeks.max(initial=0))))
+        for duration in np.unique(weeks):
+            rows = np.flatnonzero(weeks == duration)
+            hours[rows, :duration] = self.total_hours[rows, None] * self.units(duration)[self.shop_codes[rows]]
+        return hours
+
+    # (shops x width) load of every job placed at `offsets` on the leveling timeline
+    def load(self, offsets, weeks, hours):
+        load = np.zeros((len(self.shop_names), self.width))
+        _scatter(load, hours, self.shop_codes, offsets, weeks)
+        return load
+
+
+# Greedy leveling. Jobs are visited largest first; each is taken off the load and put
+# back at the option that adds the least overload. For every duration, all shifts are
+# scored at once from a sliding window over the shop's load row. Passes repeat while
+# the overload keeps improving. Starts from the given offsets and durations.
+def _level_greedy(portfolio, capacity, offsets, weeks, passes):
+    p = portfolio
+    offsets, weeks = offsets.copy(), weeks.copy()
+    hours = p.hours(weeks)
+    profiles = [hours[i, :weeks[i]] for i in range(len(weeks))]
+    load = p.load(offsets, weeks, hours)
+    order = np.argsort(-p.total_hours, kind='stable')
+    limited = np.isfinite(capacity)
+
+    best_overload = overload(load, capacity)
+    for _ in range(passes):
+        for i in order:
+            code = p.shop_codes[i]
+            if not limited[code]:
+                continue
+            row, cap = load[code], capacity[code]
+            row[offsets[i]:offsets[i] + weeks[i]] -= profiles[i]
+
+            durations, shifts = _options(int(p.num_weeks[i]), p.max_delay, p.max_advance, p.stretch)
+            starts = p.offsets[i] + shifts
+            best = None
+            for duration in durations:
+                profile = profiles[i] if duration == weeks[i] else p.profile(i, duration)
+                windows = sliding_window_view(row, duration)[starts]
+                added = (np.maximum(windows + profile - cap, 0.0) - np.maximum(windows - cap, 0.0)).sum(axis=1)
+                k = int(np.flatnonzero(added <= added.min() + COST_TOLERANCE)[0])
+                if best is None or added[k] < best[0] - COST_TOLERANCE:
+                    best = (added[k], starts[k], duration, profile)
+
+            _, offsets[i], weeks[i], profiles[i] = best
+            row[offsets[i]:offsets[i] + weeks[i]] += profiles[i]
+
+        current = overload(load, capacity)
+        if current >= best_overload - COST_TOLERANCE:
+            break
+        best_overload = current
+    return offsets, weeks
+
+
+# LP relaxation: every job spreads a unit weight over its options, overload per limited
+# shop-week is a variable and the total overload (plus a small cost per week of change)
+# is minimized with HiGHS. Each job then takes its heaviest option. The LP grows with
+# jobs x options x weeks, so it suits smaller portfolios or narrow shift windows.
+def _level_lp(portfolio, capacity):
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix
+
+    p = portfolio
+    limited = np.isfinite(capacity)
+    offsets, weeks = p.offsets.copy(), p.num_weeks.copy()
+    jobs = np.flatnonzero(limited[p.shop_codes])
+
+    cells, variables, values, change_cost, choices = [], [], [], [], []
+    for j, i in enumerate(jobs):
+        durations, shifts = _options(int(p.num_weeks[i]), p.max_delay, p.max_advance, p.stretch)
+        for duration in durations:
+            profile = p.profile(i, duration)
+            for shift in shifts:
+                start = p.offsets[i] + shift
+                cells.append(p.shop_codes[i] * p.width + start + np.arange(duration))
+                variables.append(np.full(duration, len(choices)))
+                values.append(profile)
+                change_cost.append(LP_CHANGE_COST * (abs(shift) + duration - p.num_weeks[i]))
+                choices.append((j, start, duration))
+    if not choices:
+        return offsets, weeks
+
+    # One inequality row per limited shop-week: scheduled hours - overload <= capacity
+    cells = np.concatenate(cells)
+    row_cells, rows = np.unique(cells, return_inverse=True)
+    num_choices, num_rows = len(choices), len(row_cells)
+    a_ub = coo_matrix(
+        (np.concatenate(values + [-np.ones(num_rows)]),
+         (np.concatenate([rows, np.arange(num_rows)]), np.concatenate(variables + [num_choices + np.arange(num_rows)]))),
+        shape=(num_rows, num_choices + num_rows),
+    ).tocsr()
+    b_ub = capacity[row_cells // p.width]
+
+    # Every job picks exactly one (possibly fractional) option
+    choice_job = np.array([job for job, _, _ in choices])
+    a_eq = coo_matrix((np.ones(num_choices), (choice_job, np.arange(num_choices))),
+                      shape=(len(jobs), num_choices + num_rows)).tocsr()
+    cost = np.concatenate([change_cost, np.ones(num_rows)])
+
+    solution = linprog(cost, A_ub=a_ub, b_ub=b_ub, A_eq=a_eq, b_eq=np.ones(len(jobs)), bounds=(0, None),
+                       method='highs')
+    if solution.status != 0:
+        raise ValueError(f"The leveling LP could not be solved: {solution.message}")
+
+    # Heaviest option of every job
+    x = solution.x[:num_choices]
+    order = np.lexsort((-x, choice_job))
+    first = order[np.unique(choice_job[order], return_index=True)[1]]
+    for k in first:
+        j, start, duration = choices[k]
+        offsets[jobs[j]], weeks[jobs[j]] = start, duration
+    return offsets, weeks
+
+
+# Level a portfolio of jobs against weekly shop capacities.
+#
+# `capacity` maps shop -> weekly hours available; shops not listed are unlimited.
+# Jobs may start up to `max_delay` weeks later (and `max_advance` weeks earlier) than
+# planned and may be stretched by the factors in `stretch`, resampling their curves.
+# solver='greedy' is the fast heuristic; solver='lp' solves an LP relaxation (needs
+# scipy) and then polishes the rounded plan with one greedy pass.
+def level_portfolio(curves, shops, start_weeks, num_weeks, total_hours, capacity, max_delay=8, max_advance=0,
+                    stretch=DEFAULT_STRETCH, solver='greedy', passes=3, method='linear'):
+    if solver not in LEVELING_SOLVERS:
+        raise ValueError(f"Unknown solver '{solver}'. Use one of: {', '.join(LEVELING_SOLVERS)}")
+    if max_delay < 0 or max_advance < 0:
+        raise ValueError("max_delay and max_advance cannot be negative.")
+    total_hours = np.asarray(total_hours, dtype=np.float64)
+    shops = np.asarray(shops).astype(str)
+    start_weeks = np.broadcast_to(np.asarray(start_weeks, dtype=np.int64), total_hours.shape)
+    num_weeks = np.broadcast_to(np.asarray(num_weeks, dtype=np.int64), total_hours.shape)
+    if len(num_weeks) and num_weeks.min() <= 0:
+        raise ValueError("Number of weeks must be greater than 0.")
+
+    start = time.perf_counter()
+    portfolio = _Portfolio(curves, shops, start_weeks, num_weeks, total_hours, max_delay, max_advance,
+                           tuple(stretch), method)
+    limits = np.array([capacity.get(shop, np.inf) for shop in portfolio.shop_names], dtype=np.float64)
+    if solver == 'lp':
+        offsets, weeks = _level_lp(portfolio, limits)
+        offsets, weeks = _level_greedy(portfolio, limits, offsets, weeks, passes=1)
+    else:
+        offsets, weeks = _level_greedy(portfolio, limits, portfolio.offsets, num_weeks, passes)
+    solve_seconds = time.perf_counter() - start
+
+    def load(offsets, weeks):
+        return stack_load(portfolio.hours(weeks), shops, offsets + portfolio.first_week, weeks)
+
+    return LevelingResult(
+        load(portfolio.offsets, num_weeks), load(offsets, weeks), limits,
+        np.asarray(start_weeks), np.asarray(num_weeks), offsets + portfolio.first_week, weeks,
+        solver, solve_seconds,
+    )
@@ -0,0 +1,124 @@
+import numpy as np
+
+from batch import curve_matrix
+
+# (scenario, job) rows drawn and scattered at once; bounds the scratch index and weight buffers
+MC_CHUNK_ROWS = 50_000
+DEFAULT_PERCENTILES = (10, 50, 90)
+# Default +/- range of hours and weeks around the estimate, as a fraction of it
+DEFAULT_SPREAD = 0.1
+
+
+# Draw from triangular(low, mode, high) distributions by inverting the CDF.
+# All arguments broadcast; low == high gives `mode` (no uncertainty) instead of an error.
+def triangular(rng, low, mode, high, size):
+    u = rng.random(size)
+    width = high - low
+    with np.errstate(divide='ignore', invalid='ignore'):
+        split = np.where(width > 0, (mode - low) / width, 0.0)
+    rising = low + np.sqrt(u * width * (mode - low))
+    falling = high - np.sqrt((1 - u) * width * (high - mode))
+    return np.where(u < split, rising, falling)
+
+
+# Percentile bands of a simulated portfolio load: `bands` is (percentiles x shops x weeks)
+# and `total` (percentiles x weeks) holds the bands of the yard-wide load.
+class LoadBands:
+    def __init__(self, shops, first_week, percentiles, bands, total, scenarios):
+        self.shops = np.asarray(shops)
+        self.first_week = int(first_week)
+        self.percentiles = tuple(percentiles)
+        self.bands = bands
+        self.total = total
+        self.scenarios = scenarios
+
+    @property
+    def weeks(self):
+        return self.first_week + np.arange(self.bands.shape[2])
+
+    # {"P10": weekly hours, ...} of one shop, or of the whole yard for shop='Total'
+    def band(self, shop='Total'):
+        values = self.total if shop == 'Total' else self.bands[:, list(self.shops).index(shop)]
+        return {f"P{p:g}": row for p, row in zip(self.percentiles, values)}
+
+    # Long table: one row per (shop, week) with a column per percentile
+    def to_frame(self):
+        import pandas as pd
+
+        shops = np.append(self.shops, 'Total')
+        values = np.concatenate([self.bands, self.total[:, None]], axis=1)
+        frame = pd.DataFrame({
+            'Shop': np.repeat(shops, len(self.weeks)),
+            'Week': np.tile(self.weeks, len(shops)),
+        })
+        for p, column in zip(self.percentiles, values.reshape(len(self.percentiles), -1)):
+            frame[f"P{p:g}"] = column
+        return frame
+
+
+# Simulate a portfolio under uncertain hours and durations.
+#
+# Every job gets `scenarios` draws of total hours and number of weeks from triangular
+# distributions (low, estimate, high); by default low/high are the estimate -/+ `spread`.
+# Drawn week counts are rounded and never drop below 1.
+# Each drawn job is redistributed along its shop curve (resampled curves come from the
+# scale_curve cache, one per distinct week count) and stacked at its start week.
+# Shops are simulated one at a time, in chunks of `chunk_rows` (scenario, job) rows,
+# so memory holds one (scenarios x weeks) load per shop plus the yard total.
+# Returns LoadBands with the requested percentiles of every shop's weekly load.
+def simulate_portfolio(curves, shops, start_weeks, num_weeks, total_hours, hours_low=None, hours_high=None,
+                       weeks_low=None, weeks_high=None, spread=DEFAULT_SPREAD, scenarios=1000,
+                       percentiles=DEFAULT_PERCENTILES, seed=None, chunk_rows=MC_CHUNK_ROWS, method='linear'):
+    total_hours = np.asarray(total_hours, dtype=np.float64)
+    shops = np.asarray(shops)
+    start_weeks = np.broadcast_to(np.asarray(start_weeks, dtype=np.int64), total_hours.shape)
+    num_weeks = np.broadcast_to(np.asarray(num_weeks, dtype=np.float64), total_hours.shape)
+    hours_low = total_hours * (1 - spread) if hours_low is None else np.asarray(hours_low, dtype=np.float64)
+    hours_high = total_hours * (1 + spread) if hours_high is None else np.asarray(hours_high, dtype=np.float64)
+    weeks_low = num_weeks * (1 - spread) if weeks_low is None else np.asarray(weeks_low, dtype=np.float64)
+    weeks_high = num_weeks * (1 + spread) if weeks_high is None else np.asarray(weeks_high, dtype=np.float64)
+    if np.any(hours_low > total_hours) or np.any(hours_high < total_hours) \
+            or np.any(weeks_low > num_weeks) or np.any(weeks_high < num_weeks):
+        raise ValueError("Every range must contain its estimate (low <= estimate <= high).")
+
+    rng = np.random.default_rng(seed)
+    shop_names, shop_codes = np.unique(shops, return_inverse=True)
+    first_week = int(start_weeks.min(initial=1))
+    width = int((start_weeks + np.round(weeks_high).astype(np.int64)).max(initial=first_week)) - first_week
+    bands = np.zeros((len(percentiles), len(shop_names), width))
+    total = np.zeros((scenarios, width))
+
+    for code, shop in enumerate(shop_names):
+        jobs = np.flatnonzero(shop_codes == code)
+        load = np.zeros((scenarios, width))
+        block = int(np.clip(chunk_rows // max(len(jobs), 1), 1, scenarios))
+        job_block = max(1, chunk_rows // block)
+        for first in range(0, scenarios, block):
+            rows = min(block, scenarios - first)
+            for job_start in range(0, len(jobs), job_block):
+                chunk = jobs[job_start:job_start + job_block]
+                size = (rows, len(chunk))
+                hours = triangular(rng, hours_low[chunk], total_hours[chunk], hours_high[chunk], size)
+                weeks = np.round(triangular(rng, weeks_low[chunk], num_weeks[chunk], weeks_high[chunk], size))
+                weeks = np.maximum(weeks, 1).astype(np.int64)
+
+                # Rows grouped by drawn week count: one resampled curve per group, scattered
+                # into every row's scenario load at the job's start week (no zero padding)
+                hours, weeks = hours.ravel(), weeks.ravel()
+                offset = (np.repeat(np.arange(rows) * width, len(chunk))
+                          + np.tile(start_weeks[chunk] - first_week, rows))
+                order = np.argsort(weeks, kind='stable')
+                distinct, group_start = np.unique(weeks[order], return_index=True)
+                index_parts, weight_parts = [], []
+                for count, group in zip(distinct, np.split(order, group_start[1:])):
+                    curve = curve_matrix(curves, [shop], int(count), method)[0]
+                    index_parts.append((offset[group][:, None] + np.arange(count)).ravel())
+                    weight_parts.append(np.outer(hours[group], curve).ravel())
+                load[first:first + rows] += np.bincount(
+                    np.concatenate(index_parts), np.concatenate(weight_parts), minlength=rows * width
+                ).reshape(rows, width)
+        bands[:, code] = np.percentile(load, percentiles, axis=0)
+        total += load
+
+    return LoadBands(shop_names, first_week, percentiles, bands, np.percentile(total, percentiles, axis=0),
+                     scenarios)
@@ -1,49 +1,21 @@
 import numpy as np
-import pandas as pd
 import streamlit as st
-from scipy.interpolate import interp1d
-import matplotlib.pyplot as plt
-
-# Define all curves in a dictionary for easier management
-curves = {
-    "ELE": [
-        0.13, 0.19, 0.29, 0.58, 1.16, 1.62, 2.10, 2.19, 2.30, 2.39, 2.49, 2.51, 2.57,
-        2.50, 2.49, 2.49, 2.40, 2.40, 2.40, 2.32, 2.31, 2.31, 2.31, 2.23, 2.13, 2.14,
-        2.14, 2.14, 2.23, 2.23, 2.31, 2.31, 2.31, 2.31, 2.40, 2.40, 2.40, 2.31, 2.22,
-        2.09, 1.93, 1.81, 1.63, 1.60, 1.62, 1.89, 1.97, 1.89, 1.71, 1.20
-    ],
-    "ISM": [
-        0.35, 0.54, 0.79, 1.44, 1.67, 1.76, 2.29, 2.73, 3.75, 4.95, 5.54, 6.14, 6.14,
-        6.44, 6.44, 6.29, 6.29, 5.99, 5.31, 4.29, 3.51, 3.00, 2.97, 2.83, 2.64, 2.31,
-        2.10, 1.50, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00,
-        0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00
-    ],
-    # Add other curves (OSM, PIP, etc.) similarly
-}
-
-# Normalize curves
-normalized_curves = {
-    name: [p / sum(values) for p in values] for name, values in curves.items()
-}
-
-# Function to scale a curve to a new number of weeks
-def scale_curve(percentages, original_weeks, new_weeks):
-    original_x = np.linspace(0, 1, original_weeks)  # Original weeks scaled to [0, 1]
-    new_x = np.linspace(0, 1, new_weeks)  # New weeks scaled to [0, 1]
-
-    # Interpolate the original curve
-    interpolation_function = interp1d(original_x, percentages, kind='linear')
-    scaled_curve = interpolation_function(new_x)
-
-    # Normalize the scaled curve to ensure it sums to 1
-    normalized_scaled_curve = scaled_curve / np.sum(scaled_curve)
-    return normalized_scaled_curve
+import io
+
+from curve_registry import registry
+from curve_upload import parse_values
+from excel_export import write_xlsx
+from plotting import render_png
+from result import RedistributionResult
+from resample import scale_curve
+from streamlit_sections import CACHE_MAX_ENTRIES, bulk_section, portfolio_section, session_plot
+
 
 # Function to redistribute hours based on the curve
 def redistribute_hours(total_hours, num_weeks, curve_type, custom_curve=None, percentages=None, original_weeks=None):
-    if curve_type in normalized_curves:
+    if curve_type in registry:
         # Use predefined normalized curve
-        curve = scale_curve(normalized_curves[curve_type], len(curves[curve_type]), num_weeks)
+        curve = scale_curve(registry[curve_type], registry.points, num_weeks, key=registry.key(curve_type))
     elif curve_type == 'linear':
         curve = np.ones(num_weeks) / num_weeks
     elif curve_type == 'bell':
@@ -63,20 +35,43 @@ def redistribute_hours(total_hours, num_weeks, curve_type, custom_curve=None, pe
         st.error("Invalid curve type or input data.")
         return None
 
-    # Redistribute the hours
+    # Redistribute the hours; the result is turned into a table only when it is displayed
     redistributed_hours = total_hours * curve
-    weeks = [f"Week {i+1}" for i in range(num_weeks)]
-    return pd.DataFrame({'Week': weeks, 'Redistributed Hours': redistributed_hours, 'Curve Value': curve})
+    return RedistributionResult(redistributed_hours, curve_type)
+
+# Results, Excel files and charts are cached across reruns and sessions, keyed on the
+# inputs (custom curves and percentages are passed as tuples), so repeating a
+# redistribution does not recompute, re-encode or re-render anything.
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def cached_redistribution(total_hours, num_weeks, curve_type, custom_curve=None, percentages=None, original_weeks=None):
+    return redistribute_hours(total_hours, num_weeks, curve_type, custom_curve, percentages, original_weeks)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def excel_bytes(total_hours, num_weeks, curve_type, custom_curve=None, percentages=None, original_weeks=None):
+    result = cached_redistribution(total_hours, num_weeks, curve_type, custom_curve, percentages, original_weeks)
+    output = io.BytesIO()
+    write_xlsx(
+        output,
+        ['Week', 'Redistributed Hours', 'Curve Value'],
+        result.week_blocks(),
+    )
+    return output.getvalue()
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def chart_png(total_hours, num_weeks, curve_type, custom_curve=None, percentages=None, original_weeks=None):
+    result = cached_redistribution(total_hours, num_weeks, curve_type, custom_curve, percentages, original_weeks)
+    return render_png({f"{curve_type} Curve": result.curve()}, title=f"{curve_type.capitalize()} Curve",
+                      plot=session_plot())
 
 # Streamlit app
 st.title("Budget Redistribution Tool")
 
 # Inputs
 total_hours = st.number_input("Total Hours Budget", min_value=0.0, value=1000.0, step=100.0)
-num_weeks = st.number_input("Enter desired number of weeks", min_value=1, max_value=200, value=50)
+num_weeks = st.number_input("Enter desired number of weeks", min_value=1, value=50)
 curve_type = st.selectbox(
     "Curve Shape",
-    options=list(normalized_curves.keys()) + ['linear', 'bell', 'front_loaded', 'back_loaded', 'fitted', 'custom']
+    options=registry.names + ['linear', 'bell', 'front_loaded', 'back_loaded', 'fitted', 'custom']
 )
 
 custom_curve = None
@@ -89,61 +84,55 @@ if curve_type == 'custom':
     )
     if custom_curve_input.strip():
         try:
-            custom_curve = list(map(float, custom_curve_input.strip().split(',')))
+            custom_curve = tuple(parse_values(custom_curve_input))
             if len(custom_curve) != num_weeks:
                 st.error(f"Please enter exactly {num_weeks} values.")
                 custom_curve = None
-        except ValueError:
-            st.error("Invalid input. Ensure all values are numbers separated by commas.")
+        except ValueError as e:
+            st.error(str(e))
             custom_curve = None
 
 if curve_type == 'fitted':
-    original_weeks = st.number_input("Original Number of Weeks for the Curve", min_value=1, max_value=200, value=77)
+    original_weeks = st.number_input("Original Number of Weeks for the Curve", min_value=1, value=77)
     percentage_input = st.text_area(
         f"Enter {original_weeks} percentages (comma-separated, summing to 100):", ""
     )
     if percentage_input.strip():
         try:
-            percentages = list(map(float, percentage_input.strip().split(',')))
+            percentages = tuple(parse_values(percentage_input))
             if len(percentages) != original_weeks:
                 st.error(f"Please enter exactly {original_weeks} percentages.")
                 percentages = None
             elif abs(sum(percentages) - 100) > 1e-6:
                 st.error("Percentages must sum to 100.")
                 percentages = None
-        except ValueError:
-            st.error("Invalid input. Ensure all values are numbers separated by commas.")
+        except ValueError as e:
+            st.error(str(e))
             percentages = None
 
 if st.button("Redistribute Hours"):
     if (curve_type == 'custom' and custom_curve is None) or (curve_type == 'fitted' and (percentages is None or original_weeks is None)):
         st.warning("Please provide valid input for the selected curve type.")
     else:
-        df = redistribute_hours(total_hours, num_weeks, curve_type, custom_curve, percentages, original_weeks)
-        if df is not None:
+        inputs = (total_hours, num_weeks, curve_type, custom_curve, percentages, original_weeks)
+        result = cached_redistribution(*inputs)
+        if result is not None:
             # Display the DataFrame
             st.write("Redistributed Hours:")
-            st.dataframe(df)
+            st.dataframe(result.week_frame())
 
             # Plot the curve
-            plt.figure(figsize=(10, 6))
-            plt.plot(df['Week'], df['Curve Value'], label=f"{curve_type} Curve", marker="o")
-            plt.xlabel("Weeks")
-            plt.ylabel("Redistributed Fraction")
-            plt.xticks(range(0, num_weeks, max(1, num_weeks // 10)))  # Show ticks every ~10 weeks
-            plt.title(f"{curve_type.capitalize()} Curve")
-            plt.grid(True)
-            plt.legend()
-            st.pyplot(plt)
+            st.image(chart_png(*inputs))
 
             # Save to Excel
-            output_excel = pd.ExcelWriter("redistributed_hours.xlsx", engine='xlsxwriter')
-            df.to_excel(output_excel, index=False, sheet_name="Redistribution")
-            output_excel.save()
-
             st.download_button(
                 "Download Excel File",
-                data=open("redistributed_hours.xlsx", "rb"),
+                data=excel_bytes(*inputs),
                 file_name="redistributed_hours.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
\ No newline at end of file
+            )
+
+
+# Bulk custom curves and portfolio loading (shared with the other Streamlit frontend)
+bulk_section(total_hours, num_weeks, 'fitted percentages')
+portfolio_section()
@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch import redistribute_batch
+
+# Target number of rows per shard sent to a worker process
+SHARD_ROWS = 50_000
+
+# Curve table and resampling method of the current worker process, set once by _init_worker
+_worker_curves = None
+_worker_method = 'linear'
+
+
+def _init_worker(curves, method):
+    global _worker_curves, _worker_method
+    _worker_curves = curves
+    _worker_method = method
+
+
+def _redistribute_shard(total_hours, curve_ids, num_weeks):
+    return redistribute_batch(_worker_curves, total_hours, curve_ids, num_weeks, _worker_method)
+
+
+# Split row indices into shards of neighbouring week counts.
+# Rows are ordered by week count first, so every shard only covers a narrow band
+# of week counts and needs few resampled curves and little zero padding.
+def week_buckets(num_weeks, num_shards):
+    order = np.argsort(num_weeks, kind='stable')
+    return [shard for shard in np.array_split(order, num_shards) if len(shard)]
+
+
+# Redistributes batches on a pool of worker processes.
+# Each worker receives the curve table once when it starts; results are merged
+# back into input row order, so the output does not depend on scheduling.
+class ParallelRedistributor:
+    def __init__(self, curves, workers=None, shard_rows=SHARD_ROWS, method='linear'):
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_rows = shard_rows
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(curves, method)
+        )
+
+    def redistribute(self, total_hours, curve_ids, num_weeks):
+        total_hours = np.asarray(total_hours, dtype=np.float64)
+        curve_ids = np.asarray(curve_ids)
+        num_weeks = np.broadcast_to(np.asarray(num_weeks, dtype=np.int64), total_hours.shape)
+
+        num_shards = max(self.workers, -(-len(total_hours) // self.shard_rows))
+        shards = week_buckets(num_weeks, num_shards)
+        futures = [
+            self.executor.submit(_redistribute_shard, total_hours[rows], curve_ids[rows], num_weeks[rows])
+            for rows in shards
+        ]
+
+        result = np.zeros((len(total_hours), int(num_weeks.max(initial=0))))
+        for rows, future in zip(shards, futures):
+            shard_result = future.result()
+            result[rows, :shard_result.shape[1]] = shard_result
+        return result
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
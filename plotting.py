@@ -0,0 +1,89 @@
+import io
+import threading
+
+import numpy as np
+
+# Longest curve drawn point by point; longer curves are downsampled before plotting
+MAX_POINTS = 400
+# Curves up to this many weeks are drawn with a marker on every week
+MARKER_POINTS = 60
+
+
+# Reduce a curve to at most `max_points` points, keeping the minimum and maximum
+# of every bucket so peaks and troughs survive the downsampling
+def downsample(x, y, max_points=MAX_POINTS):
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= max_points:
+        return x, y
+    buckets = max_points // 2
+    edges = np.linspace(0, len(y), buckets + 1).astype(np.int64)
+    keep = np.empty(2 * buckets, dtype=np.int64)
+    for i, (start, end) in enumerate(zip(edges[:-1], edges[1:])):
+        segment = y[start:end]
+        low, high = start + np.argmin(segment), start + np.argmax(segment)
+        keep[2 * i], keep[2 * i + 1] = min(low, high), max(low, high)
+    keep = np.unique(keep)
+    return x[keep], y[keep]
+
+
+# A chart that is created once and redrawn in place.
+# It uses a standalone matplotlib Figure (not pyplot), so nothing is registered
+# globally and there is nothing to close; redrawing clears the axes rather than
+# creating a new figure. Pass `figure` to draw on an existing (e.g. Qt canvas) figure.
+class CurvePlot:
+    def __init__(self, figsize=(10, 6), figure=None):
+        if figure is None:
+            from matplotlib.figure import Figure
+
+            figure = Figure(figsize=figsize)
+        self.figure = figure
+        self.ax = figure.subplots()
+
+    # Draw one or more curves given as {label: weekly values}; the first value is at week `first_week`.
+    # `bands` shades a range around curves, as {label: (lower values, upper values)}.
+    def draw(self, curves, title=None, xlabel="Weeks", ylabel="Redistributed Fraction", max_points=MAX_POINTS,
+             first_week=1, bands=None):
+        ax = self.ax
+        ax.clear()
+        num_weeks = 1
+        for label, values in curves.items():
+            values = np.asarray(values)
+            num_weeks = max(num_weeks, len(values))
+            x, y = downsample(np.arange(first_week, first_week + len(values)), values, max_points)
+            line, = ax.plot(x, y, label=label, marker="o" if len(values) <= MARKER_POINTS else None)
+            if bands and label in bands:
+                lower, upper = (np.asarray(v) for v in bands[label])
+                # Evenly spaced weeks, so both edges of the band share the same x values
+                keep = np.unique(np.linspace(0, len(lower) - 1, min(len(lower), max_points)).astype(np.int64))
+                ax.fill_between(first_week + keep, lower[keep], upper[keep], color=line.get_color(), alpha=0.2)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.set_xticks(range(first_week, first_week + num_weeks, max(1, num_weeks // 10)))  # Show ticks every ~10 weeks
+        if title:
+            ax.set_title(title)
+        ax.grid(True)
+        if curves:
+            ax.legend()
+        return self.figure
+
+    def png(self):
+        output = io.BytesIO()
+        self.figure.savefig(output, format='png')
+        return output.getvalue()
+
+
+# One reusable chart per thread, for callers that render many charts from the same
+# long-lived thread (e.g. benchmark.py). Streamlit runs every rerun on a new script
+# thread, so a thread-local figure would be rebuilt almost every time; the Streamlit
+# frontends pass the CurvePlot kept in their session state as `plot` instead.
+_thread_plots = threading.local()
+
+
+def render_png(curves, title=None, plot=None, **kwargs):
+    if plot is None:
+        plot = getattr(_thread_plots, "plot", None)
+        if plot is None:
+            plot = _thread_plots.plot = CurvePlot()
+    plot.draw(curves, title=title, **kwargs)
+    return plot.png()
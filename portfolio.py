@@ -0,0 +1,123 @@
+import numpy as np
+
+from batch import redistribute_batch
+
+# Jobs redistributed per chunk while stacking a portfolio, bounding the (jobs x weeks) scratch matrix
+PORTFOLIO_CHUNK_ROWS = 50_000
+
+# Columns of a portfolio table (see load_from_table); 'job' is optional
+PORTFOLIO_COLUMNS = ('shop', 'start_week', 'weeks', 'hours')
+
+
+# Weekly load of a whole portfolio: one row per shop, one column per absolute week
+# starting at `first_week`.
+class PortfolioLoad:
+    def __init__(self, shops, first_week, load):
+        self.shops = np.asarray(shops)
+        self.first_week = int(first_week)
+        self.load = load
+
+    @property
+    def weeks(self):
+        return self.first_week + np.arange(self.load.shape[1])
+
+    # Yard-wide load per week, summed over all shops
+    @property
+    def total(self):
+        return self.load.sum(axis=0)
+
+    # Week with the highest yard-wide load and its hours
+    def peak(self):
+        total = self.total
+        week = int(np.argmax(total)) if len(total) else 0
+        return self.first_week + week, float(total[week]) if len(total) else 0.0
+
+    def week_labels(self):
+        return [f"Week {week}" for week in self.weeks]
+
+    def to_frame(self):
+        import pandas as pd
+
+        frame = pd.DataFrame(self.load, index=pd.Index(self.shops, name='Shop'), columns=self.week_labels())
+        frame.loc['Total'] = self.total
+        return frame
+
+    # Weekly load per shop as {shop: hours}, plus the yard-wide total, for plotting
+    def curves(self):
+        curves = dict(zip(self.shops, self.load))
+        curves['Total'] = self.total
+        return curves
+
+    # (labels, values) blocks for excel_export: one row per shop and a Total row
+    def excel_blocks(self):
+        yield [np.append(self.shops, 'Total')], np.vstack([self.load, self.total])
+
+
+# Scatter-add redistributed rows into a flat (shops x weeks) load buffer.
+# Row i lands in shop row `shop_codes[i]` starting at column `offsets[i]`; only its
+# first `num_weeks[i]` weeks are added, so zero padding never lands past a job's end.
+def _scatter(load, hours, shop_codes, offsets, num_weeks):
+    width = load.shape[1]
+    week = np.arange(hours.shape[1])
+    inside = week < num_weeks[:, None]
+    flat = (shop_codes * width + offsets)[:, None] + week
+    load += np.bincount(flat[inside], weights=hours[inside], minlength=load.size).reshape(load.shape)
+
+
+# Stack already redistributed rows (rows x weeks, padded with zeros) that start at
+# `start_weeks` into a PortfolioLoad
+def stack_load(hours, shops, start_weeks, num_weeks=None):
+    hours = np.atleast_2d(np.asarray(hours, dtype=np.float64))
+    start_weeks = np.broadcast_to(np.asarray(start_weeks, dtype=np.int64), hours.shape[:1])
+    num_weeks = np.broadcast_to(np.asarray(hours.shape[1] if num_weeks is None else num_weeks, dtype=np.int64),
+                                hours.shape[:1])
+    shop_names, shop_codes = np.unique(np.broadcast_to(np.asarray(shops), hours.shape[:1]), return_inverse=True)
+    first_week = int(start_weeks.min(initial=1))
+    width = int((start_weeks + num_weeks).max(initial=first_week)) - first_week
+    load = np.zeros((len(shop_names), width))
+    _scatter(load, hours, shop_codes, start_weeks - first_week, num_weeks)
+    return PortfolioLoad(shop_names, first_week, load)
+
+
+# Redistribute a portfolio of jobs, given as (shop, start week, weeks, hours) per job,
+# and stack them on a shared timeline into the weekly load of every shop.
+# Jobs are redistributed in chunks of `chunk_rows` and scatter-added straight into
+# the load matrix, so memory stays bounded by the chunk rather than the portfolio.
+def portfolio_load(curves, shops, start_weeks, num_weeks, total_hours, method='linear',
+                   chunk_rows=PORTFOLIO_CHUNK_ROWS):
+    total_hours = np.asarray(total_hours, dtype=np.float64)
+    shops = np.asarray(shops)
+    start_weeks = np.broadcast_to(np.asarray(start_weeks, dtype=np.int64), total_hours.shape)
+    num_weeks = np.broadcast_to(np.asarray(num_weeks, dtype=np.int64), total_hours.shape)
+    if len(num_weeks) and num_weeks.min() <= 0:
+        raise ValueError("Number of weeks must be greater than 0.")
+
+    shop_names, shop_codes = np.unique(shops, return_inverse=True)
+    first_week = int(start_weeks.min(initial=1))
+    width = int((start_weeks + num_weeks).max(initial=first_week)) - first_week
+    load = np.zeros((len(shop_names), width))
+    for start in range(0, len(total_hours), chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        hours = redistribute_batch(curves, total_hours[rows], shops[rows], num_weeks[rows], method)
+        _scatter(load, hours, shop_codes[rows], start_weeks[rows] - first_week, num_weeks[rows])
+    return PortfolioLoad(shop_names, first_week, load)
+
+
+# (shops, start weeks, weeks, hours) arrays of a portfolio table (DataFrame) with
+# PORTFOLIO_COLUMNS, matched case-insensitively
+def portfolio_columns(table):
+    columns = {str(c).strip().lower(): c for c in table.columns}
+    missing = [c for c in PORTFOLIO_COLUMNS if c not in columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}. Expected: {', '.join(PORTFOLIO_COLUMNS)}")
+    return (
+        table[columns['shop']].astype(str).to_numpy(),
+        table[columns['start_week']].to_numpy(dtype=np.int64),
+        table[columns['weeks']].to_numpy(dtype=np.int64),
+        table[columns['hours']].to_numpy(dtype=np.float64),
+    )
+
+
+# Portfolio load from a table with PORTFOLIO_COLUMNS
+def load_from_table(curves, table, method='linear'):
+    return portfolio_load(curves, *portfolio_columns(table), method=method)
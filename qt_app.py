@@ -1,34 +1,22 @@
 import sys
 import numpy as np
-import pandas as pd
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
 from PyQt5.QtWidgets import (
     QApplication, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QComboBox, QPushButton, QFileDialog, QWidget, QMessageBox, QInputDialog
+    QComboBox, QPushButton, QFileDialog, QWidget, QMessageBox, QInputDialog, QProgressBar
 )
-import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
-
-# Define normalized curves
-curves = {
-    "ELE": [0.13, 0.19, 0.29, 0.58, 1.16, 1.62, 2.10, 2.19, 2.30, 2.39, 2.49, 2.51],
-    "ISM": [0.35, 0.54, 0.79, 1.44, 1.67, 1.76, 2.29, 2.73, 3.75, 4.95, 5.54, 6.14],
-}
-normalized_curves = {
-    name: [p / sum(values) for p in values] for name, values in curves.items()
-}
-
-# Helper function to scale a curve
-def scale_curve(percentages, original_weeks, new_weeks):
-    original_x = np.linspace(0, 1, original_weeks)
-    new_x = np.linspace(0, 1, new_weeks)
-    interpolation_function = interp1d(original_x, percentages, kind="linear")
-    scaled_curve = interpolation_function(new_x)
-    return scaled_curve / np.sum(scaled_curve)
+
+from curve_registry import registry
+from curve_upload import load_curve_table, parse_values
+from excel_export import ExcelStreamWriter
+from plotting import CurvePlot
+from result import RedistributionResult
+from resample import scale_curve
 
 # Function to redistribute hours
 def redistribute_hours(total_hours, num_weeks, curve_type, custom_curve=None, percentages=None, original_weeks=None):
-    if curve_type in normalized_curves:
-        curve = scale_curve(normalized_curves[curve_type], len(curves[curve_type]), num_weeks)
+    if curve_type in registry:
+        curve = scale_curve(registry[curve_type], registry.points, num_weeks, key=registry.key(curve_type))
     elif curve_type == "Linear":
         curve = np.ones(num_weeks) / num_weeks
     elif curve_type == "Bell":
@@ -43,8 +31,74 @@ def redistribute_hours(total_hours, num_weeks, curve_type, custom_curve=None, pe
 
     # Redistribute the hours
     redistributed_hours = total_hours * curve
-    weeks = [f"Week {i+1}" for i in range(num_weeks)]
-    return pd.DataFrame({"Week": weeks, "Redistributed Hours": redistributed_hours, "Curve Value": curve})
+    return RedistributionResult(redistributed_hours, curve_type)
+
+# Rows written per block when exporting, between progress updates and cancellation checks
+EXPORT_BLOCK_ROWS = 5000
+
+# Write the results to xlsx block by block, reporting progress and stopping early when cancelled
+def export_excel(task, file_path, result):
+    weeks = np.array(result.week_labels())
+    values = np.column_stack([result.row_hours(), result.curve()])
+    with ExcelStreamWriter(file_path, ["Week", "Redistributed Hours", "Curve Value"]) as writer:
+        for start in range(0, len(values), EXPORT_BLOCK_ROWS):
+            if task.is_cancelled:
+                return None
+            end = start + EXPORT_BLOCK_ROWS
+            writer.write_block([weeks[start:end]], values[start:end])
+            task.report(100 * min(end, len(values)) / len(values))
+    return file_path
+
+# Redistribute every curve of an uploaded CSV/xlsx file (one curve per row) in one pass
+# and write them to xlsx. Returns (file path, curves written, problems of skipped rows).
+def bulk_redistribute(task, input_path, file_path, total_hours, num_weeks, percentages):
+    table = load_curve_table(input_path, percentages=percentages)
+    result = table.redistribute(total_hours, num_weeks if percentages else None)
+    with ExcelStreamWriter(file_path, ["Name", "Curve"] + result.week_labels()) as writer:
+        for labels, values in result.excel_blocks(EXPORT_BLOCK_ROWS):
+            if task.is_cancelled:
+                return None
+            writer.write_block(labels, values)
+            task.report(100 * (writer.row - 1) / max(len(result), 1))
+    return file_path, len(result), table.problems()
+
+# Signals of a background task (a QRunnable cannot emit signals itself)
+class TaskSignals(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+# Runs `fn(task, *args)` on a thread pool so the window stays responsive.
+# `fn` may call task.report(percent) and should return early once task.is_cancelled is set.
+class Task(QRunnable):
+    def __init__(self, description, fn, *args):
+        super().__init__()
+        self.description = description
+        self.fn = fn
+        self.args = args
+        self.signals = TaskSignals()
+        self.is_cancelled = False
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def report(self, percent):
+        self.signals.progress.emit(int(percent))
+
+    def run(self):
+        if self.is_cancelled:
+            self.signals.cancelled.emit()
+            return
+        try:
+            result = self.fn(self, *self.args)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        if self.is_cancelled:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(result)
 
 # Main Application Window
 class BudgetRedistributionApp(QWidget):
@@ -52,6 +106,11 @@ class BudgetRedistributionApp(QWidget):
         super().__init__()
         self.setWindowTitle("Budget Redistribution Tool")
         self.setGeometry(100, 100, 600, 400)
+        self.plot = None
+        self.tasks = []
+        # One worker thread: redistributions and exports queue up and run in order
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
         self.init_ui()
 
     def init_ui(self):
@@ -70,7 +129,7 @@ class BudgetRedistributionApp(QWidget):
 
         layout.addWidget(QLabel("Curve Type:"))
         self.curve_selector = QComboBox()
-        self.curve_selector.addItems(["ELE", "ISM", "Linear", "Bell", "Custom", "Fitted"])
+        self.curve_selector.addItems(registry.names + ["Linear", "Bell", "Custom", "Fitted"])
         layout.addWidget(self.curve_selector)
 
         # Buttons
@@ -84,32 +143,73 @@ class BudgetRedistributionApp(QWidget):
         self.save_button.clicked.connect(self.save_to_excel)
         button_layout.addWidget(self.save_button)
 
+        self.bulk_button = QPushButton("Bulk Upload...")
+        self.bulk_button.clicked.connect(self.bulk_upload)
+        button_layout.addWidget(self.bulk_button)
+
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setDisabled(True)
+        self.cancel_button.clicked.connect(self.cancel_tasks)
+        button_layout.addWidget(self.cancel_button)
+
         layout.addLayout(button_layout)
+
+        # Progress of the running task and number of queued tasks
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel("Ready")
+        layout.addWidget(self.status_label)
+
         self.setLayout(layout)
 
+    def start_task(self, task, on_finished):
+        task.signals.progress.connect(self.progress_bar.setValue)
+        task.signals.finished.connect(on_finished)
+        task.signals.failed.connect(lambda message: QMessageBox.critical(self, "Error", f"An error occurred: {message}"))
+        for signal in (task.signals.finished, task.signals.failed, task.signals.cancelled):
+            signal.connect(lambda *_, task=task: self.task_done(task))
+        self.tasks.append(task)
+        self.pool.start(task)
+        self.update_status()
+
+    def task_done(self, task):
+        self.tasks.remove(task)
+        self.progress_bar.setValue(0)
+        self.update_status()
+
+    def update_status(self):
+        self.cancel_button.setDisabled(not self.tasks)
+        if self.tasks:
+            queued = f" ({len(self.tasks) - 1} queued)" if len(self.tasks) > 1 else ""
+            self.status_label.setText(f"{self.tasks[0].description}...{queued}")
+        else:
+            self.status_label.setText("Ready")
+
+    # Cancel the running task and drop everything still queued
+    def cancel_tasks(self):
+        for task in self.tasks:
+            task.cancel()
+
     def redistribute(self):
         try:
             total_hours = float(self.total_hours_input.text())
             num_weeks = int(self.num_weeks_input.text())
             curve_type = self.curve_selector.currentText()
+            custom_curve = None
+            percentages = None
+            original_weeks = None
 
-            if curve_type in normalized_curves:
-                curve = normalized_curves[curve_type]
-            elif curve_type == "Linear":
-                curve = np.ones(num_weeks) / num_weeks
-            elif curve_type == "Bell":
-                curve = np.exp(-0.5 * (np.linspace(-2, 2, num_weeks) ** 2))
-                curve /= np.sum(curve)
-            elif curve_type == "Custom":
+            # Ask for any extra input here, on the GUI thread, before handing off to the worker
+            if curve_type == "Custom":
                 custom_input, ok = self.get_user_input("Custom Curve", f"Enter {num_weeks} values (comma-separated):")
                 if not ok or not custom_input:
                     QMessageBox.warning(self, "Error", "Invalid custom input.")
                     return
-                custom_curve = [float(x) for x in custom_input.split(",")]
+                custom_curve = parse_values(custom_input)
                 if len(custom_curve) != num_weeks:
                     QMessageBox.warning(self, "Error", f"Enter exactly {num_weeks} values.")
                     return
-                curve = np.array(custom_curve) / np.sum(custom_curve)
             elif curve_type == "Fitted":
                 original_weeks_input, ok = self.get_user_input("Original Weeks", "Enter the number of weeks in the original curve:")
                 if not ok or not original_weeks_input.isdigit():
@@ -123,35 +223,42 @@ class BudgetRedistributionApp(QWidget):
                 if not ok or not percentages_input:
                     QMessageBox.warning(self, "Error", "Invalid input for fitted curve.")
                     return
-                percentages = [float(x) for x in percentages_input.split(",")]
+                percentages = parse_values(percentages_input)
                 if len(percentages) != original_weeks:
                     QMessageBox.warning(self, "Error", f"Enter exactly {original_weeks} percentages.")
                     return
-                curve = scale_curve(percentages, original_weeks, num_weeks)
-            else:
+            elif curve_type not in registry and curve_type not in ("Linear", "Bell"):
                 QMessageBox.critical(self, "Error", "Invalid curve type selected!")
                 return
 
-            # Redistribute hours
-            self.results = redistribute_hours(total_hours, num_weeks, curve_type, custom_curve, percentages, original_weeks)
-            QMessageBox.information(self, "Success", "Redistribution complete!")
-            self.plot_curve()
-            self.save_button.setDisabled(False)
+            # Redistribute hours in the background
+            task = Task(
+                f"Redistributing {total_hours:g} hours over {num_weeks} weeks ({curve_type})",
+                lambda task: redistribute_hours(total_hours, num_weeks, curve_type, custom_curve, percentages, original_weeks),
+            )
+            self.start_task(task, self.redistribution_done)
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}")
 
+    def redistribution_done(self, results):
+        self.results = results
+        self.plot_curve()
+        self.save_button.setDisabled(False)
+
     def plot_curve(self):
         if hasattr(self, "results"):
-            df = self.results
-            plt.figure(figsize=(8, 5))
-            plt.plot(df["Week"], df["Curve Value"], label="Curve", marker="o")
-            plt.xticks(rotation=45)
-            plt.xlabel("Weeks")
-            plt.ylabel("Redistributed Fraction")
-            plt.title("Redistributed Curve")
-            plt.grid(True)
-            plt.show()
+            if self.plot is None:
+                # Embed one chart in the window on first use and redraw it on every run
+                from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+                from matplotlib.figure import Figure
+
+                self.canvas = FigureCanvasQTAgg(Figure(figsize=(8, 5)))
+                self.layout().addWidget(self.canvas)
+                self.plot = CurvePlot(figure=self.canvas.figure)
+
+            self.plot.draw({"Curve": self.results.curve()}, title="Redistributed Curve")
+            self.canvas.draw_idle()
 
     def save_to_excel(self):
         if hasattr(self, "results"):
@@ -160,8 +267,43 @@ class BudgetRedistributionApp(QWidget):
                 self, "Save File", "", "Excel Files (*.xlsx)", options=options
             )
             if file_path:
-                self.results.to_excel(file_path, index=False)
-                QMessageBox.information(self, "Success", f"File saved to {file_path}")
+                task = Task(f"Saving {file_path}", export_excel, file_path, self.results)
+                self.start_task(task, lambda path: QMessageBox.information(self, "Success", f"File saved to {path}"))
+
+    # Redistribute a whole file of custom curves and save the result, in the background
+    def bulk_upload(self):
+        try:
+            total_hours = float(self.total_hours_input.text())
+            num_weeks = int(self.num_weeks_input.text())
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Enter the total hours and number of weeks used for rows without their own.")
+            return
+        input_path, _ = QFileDialog.getOpenFileName(self, "Open Curves", "", "Curve Files (*.csv *.xlsx)")
+        if not input_path:
+            return
+        answer = QMessageBox.question(
+            self, "Curve Values",
+            f"Are the values percentages to scale to {num_weeks} weeks?\n(No: use them as weekly values)",
+        )
+        percentages = answer == QMessageBox.Yes
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "Excel Files (*.xlsx)")
+        if file_path:
+            task = Task(
+                f"Redistributing curves from {input_path}", bulk_redistribute,
+                input_path, file_path, total_hours, num_weeks, percentages,
+            )
+            self.start_task(task, self.bulk_done)
+
+    def bulk_done(self, output):
+        if output is None:
+            return
+        file_path, written, problems = output
+        message = f"{written} curve(s) saved to {file_path}"
+        if problems:
+            skipped = "\n".join(f"Row {row} ({name}): {problem}" for row, name, problem in problems[:20])
+            more = f"\n... and {len(problems) - 20} more" if len(problems) > 20 else ""
+            message += f"\n\n{len(problems)} row(s) skipped:\n{skipped}{more}"
+        QMessageBox.information(self, "Bulk Upload", message)
 
     def get_user_input(self, title, label):
         """Helper method to show a dialog for user input."""
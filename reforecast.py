@@ -0,0 +1,108 @@
+import numpy as np
+
+from batch import redistribute_batch
+
+# Booked hours that differ from the stored ones by less than this (relative) count as
+# unchanged, so a CSV round trip of the actuals does not trigger a re-forecast
+ACTUALS_TOLERANCE = 1e-9
+
+
+# Re-forecast a batch of jobs from actuals to date.
+#
+# For each row, weeks 1..k keep the actual hours already booked and the remaining
+# budget (budget minus actuals, never below 0) is spread over weeks k+1..N along the
+# tail of the row's curve, renormalized to sum to 1. The curves come from the
+# resampling cache, so re-forecasting costs no new interpolation.
+#
+# `actuals` is a (rows x weeks) matrix; only its first k entries per row are used.
+# Returns a (rows x width) hours matrix, `width` defaulting to the longest job.
+# A finished job (k = N) has no weeks left, so whatever it did not spend is not
+# forecast anywhere; the row then sums to its actuals (see PortfolioForecast.unspent).
+def reforecast_batch(curves, budgets, curve_ids, num_weeks, actuals, weeks_done, width=None, method='linear'):
+    budgets = np.asarray(budgets, dtype=np.float64)
+    num_weeks = np.broadcast_to(np.asarray(num_weeks, dtype=np.int64), budgets.shape)
+    weeks_done = np.broadcast_to(np.asarray(weeks_done, dtype=np.int64), budgets.shape)
+    if np.any(weeks_done < 0) or np.any(weeks_done > num_weeks):
+        raise ValueError("Weeks done must be between 0 and the number of weeks of the job.")
+    width = int(num_weeks.max(initial=0)) if width is None else width
+
+    week = np.arange(width)
+    past = week < weeks_done[:, None]
+    future = ~past & (week < num_weeks[:, None])
+
+    # Actual hours to date
+    actuals = np.asarray(actuals, dtype=np.float64)
+    booked = np.zeros((len(budgets), width))
+    columns = min(width, actuals.shape[1]) if actuals.ndim == 2 else 0
+    booked[:, :columns] = np.where(past[:, :columns], actuals[:, :columns], 0.0)
+    remaining = np.maximum(budgets - booked.sum(axis=1), 0.0)
+
+    # Tail of the resampled curve, renormalized over the remaining weeks
+    curve = np.zeros((len(budgets), width))
+    full = redistribute_batch(curves, np.ones(len(budgets)), curve_ids, num_weeks, method)
+    curve[:, :full.shape[1]] = full
+    tail = np.where(future, curve, 0.0)
+    tail_sum = tail.sum(axis=1)
+    # A curve that has already finished (e.g. trailing zeros) spreads what is left evenly
+    flat = (tail_sum <= 0) & future.any(axis=1)
+    tail[flat] = future[flat]
+    tail_sum[flat] = future[flat].sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        forecast = np.where(tail_sum[:, None] > 0, tail / tail_sum[:, None], 0.0) * remaining[:, None]
+    return booked + forecast
+
+
+# A stored portfolio forecast that is updated in place as actuals come in.
+# Only the rows passed to update_actuals are recomputed; all other rows are untouched.
+# Pass the `hours` (and `weeks_done`) of a stored forecast to pick up where an earlier
+# run left off; otherwise the whole budget is redistributed once.
+class PortfolioForecast:
+    def __init__(self, curves, budgets, curve_ids, num_weeks, hours=None, weeks_done=None, method='linear'):
+        self.curves = curves
+        self.method = method
+        self.budgets = np.asarray(budgets, dtype=np.float64)
+        self.curve_ids = np.asarray(curve_ids)
+        self.num_weeks = np.broadcast_to(np.asarray(num_weeks, dtype=np.int64), self.budgets.shape).copy()
+        self.weeks_done = np.broadcast_to(np.asarray(0 if weeks_done is None else weeks_done, dtype=np.int64),
+                                          self.budgets.shape).copy()
+        if hours is None:
+            self.hours = redistribute_batch(curves, self.budgets, self.curve_ids, self.num_weeks, method)
+        else:
+            self.hours = np.array(hours, dtype=np.float64)
+            if self.hours.shape[0] != len(self.budgets) or self.hours.shape[1] < self.num_weeks.max(initial=0):
+                raise ValueError("The stored hours must have one row per job and a column for every week.")
+
+    # Forecast of a stored RedistributionResult; each row's budget is its total hours
+    @classmethod
+    def from_result(cls, curves, result, weeks_done=None, method='linear'):
+        hours = result.hours.astype(np.float64)
+        return cls(curves, hours.sum(axis=1), result.shops, result.num_weeks, hours=hours, weeks_done=weeks_done,
+                   method=method)
+
+    # Rows whose stored forecast does not match `actuals` for weeks 1..k: a different
+    # number of weeks done or a booked week that was corrected since
+    def changed_rows(self, actuals, weeks_done):
+        weeks_done = np.broadcast_to(np.asarray(weeks_done, dtype=np.int64), self.budgets.shape)
+        actuals = np.asarray(actuals, dtype=np.float64)
+        columns = min(self.hours.shape[1], actuals.shape[1])
+        past = np.arange(columns) < weeks_done[:, None]
+        booked = np.isclose(actuals[:, :columns], self.hours[:, :columns], rtol=ACTUALS_TOLERANCE, atol=0.0)
+        differs = past & ~booked
+        return np.flatnonzero((weeks_done != self.weeks_done) | differs.any(axis=1))
+
+    # Record actuals for weeks 1..k of the given rows and re-forecast those rows only
+    def update_actuals(self, rows, actuals, weeks_done):
+        rows = np.asarray(rows, dtype=np.int64)
+        self.hours[rows] = reforecast_batch(
+            self.curves, self.budgets[rows], self.curve_ids[rows], self.num_weeks[rows],
+            actuals, weeks_done, width=self.hours.shape[1], method=self.method,
+        )
+        self.weeks_done[rows] = weeks_done
+        return self.hours[rows]
+
+    # Budget left over by finished jobs that spent less than planned (0 for every other
+    # row). reforecast_batch has no weeks left to put it in, so it is reported here.
+    def unspent(self):
+        finished = self.weeks_done >= self.num_weeks
+        return np.where(finished, np.maximum(self.budgets - self.hours.sum(axis=1), 0.0), 0.0)
@@ -0,0 +1,184 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Maximum number of resampled curves kept in memory.
+# 13 shop curves x 200 week counts fits with plenty of room for custom curves.
+RESAMPLE_CACHE_SIZE = 4096
+
+
+# Small LRU cache for resampled curves, keyed by (curve key, original weeks, new weeks, method).
+# A lock keeps it consistent when several threads (e.g. the HTTP service) share it.
+class ResampleCache:
+    def __init__(self, maxsize=RESAMPLE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            curve = self._entries.get(key)
+            if curve is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return curve
+
+    def put(self, key, curve):
+        with self._lock:
+            self._entries[key] = curve
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+resample_cache = ResampleCache()
+
+
+# Content hash used as the cache key for curves that have no name (custom / fitted input)
+def curve_key(percentages):
+    data = np.ascontiguousarray(percentages, dtype=np.float64)
+    return hashlib.blake2b(data.tobytes(), digest_size=16).hexdigest()
+
+
+# How a curve is stretched or compressed onto a new number of weeks:
+#   linear - linear interpolation of the point values, then renormalized (the original method)
+#   area   - rebins the cumulative share of hours, so every phase of the curve keeps its
+#            share exactly (the curve is treated as constant within each original point)
+#   pchip  - like area, but the cumulative share is interpolated with a monotone cubic
+#            (PCHIP), which gives a smoother curve that still conserves every share and
+#            never goes negative
+RESAMPLE_METHODS = ('linear', 'area', 'pchip')
+
+
+def check_method(method):
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"Unknown resampling method '{method}'. Use one of: {', '.join(RESAMPLE_METHODS)}")
+
+
+# Cumulative share of hours at every point boundary, from 0 to 1.
+# `curves` is (..., points); the result is (..., points + 1). Padding (NaN or 0)
+# after the end of a curve keeps the share at 1.
+def cumulative_share(curves):
+    curves = np.asarray(curves, dtype=np.float64)
+    cumulative = np.zeros(curves.shape[:-1] + (curves.shape[-1] + 1,))
+    np.nancumsum(curves, axis=-1, out=cumulative[..., 1:])
+    total = cumulative[..., -1:]
+    return np.divide(cumulative, total, out=np.zeros_like(cumulative), where=total > 0)
+
+
+# Slopes of a monotone cubic (PCHIP, Fritsch-Carlson) through the cumulative shares of
+# every row, on unit-spaced boundaries 0..lengths[i]. Matches scipy's PchipInterpolator.
+def _pchip_slopes(cumulative, lengths):
+    delta = np.diff(cumulative, axis=1)
+    left, right = delta[:, :-1], delta[:, 1:]
+    slopes = np.zeros_like(cumulative)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Weighted harmonic mean of the neighbouring secants; 0 where either is flat
+        slopes[:, 1:-1] = np.where((left > 0) & (right > 0), 2 * left * right / (left + right), 0.0)
+
+    # End points: one-sided three-point estimate, which cannot go negative for a rising curve
+    rows = np.arange(len(lengths))
+    last = lengths - 1
+    first_delta, second_delta = delta[:, 0], delta[rows, np.minimum(1, last)]
+    last_delta, before_last_delta = delta[rows, last], delta[rows, np.maximum(last - 1, 0)]
+    slopes[:, 0] = np.maximum((3 * first_delta - second_delta) / 2, 0.0)
+    slopes[rows, lengths] = np.maximum((3 * last_delta - before_last_delta) / 2, 0.0)
+    # A single interval is a straight line
+    single = lengths == 1
+    slopes[single, 0] = slopes[single, 1] = first_delta[single]
+    return slopes
+
+
+# Value at fractional `position`s of each row, interpolating linearly or, with
+# `slopes`, with the cubic Hermite spline through those slopes
+def _interpolate(values, lengths, position, slopes=None):
+    low = np.minimum(np.floor(position).astype(np.int64), (lengths - 1)[:, None])
+    t = position - low
+    y0 = np.take_along_axis(values, low, axis=1)
+    y1 = np.take_along_axis(values, low + 1, axis=1)
+    if slopes is None:
+        return y0 + t * (y1 - y0)
+    d0 = np.take_along_axis(slopes, low, axis=1)
+    d1 = np.take_along_axis(slopes, low + 1, axis=1)
+    t2, t3 = t * t, t * t * t
+    return (2 * t3 - 3 * t2 + 1) * y0 + (t3 - 2 * t2 + t) * d0 + (-2 * t3 + 3 * t2) * y1 + (t3 - t2) * d1
+
+
+# Rebin cumulative shares (rows x points + 1, see cumulative_share) onto new week counts.
+# Row i has `lengths[i]` points and is rebinned onto `num_weeks[i]` weeks, each new week
+# receiving the share of hours between its boundaries. Vectorized over all rows; the
+# result is (rows x max weeks), padded with zeros, and every row sums to 1.
+def rebin_cumulative(cumulative, lengths, num_weeks, method='area'):
+    check_method(method)
+    cumulative = np.atleast_2d(np.asarray(cumulative, dtype=np.float64))
+    lengths = np.broadcast_to(np.asarray(lengths, dtype=np.int64), cumulative.shape[:1])
+    num_weeks = np.broadcast_to(np.asarray(num_weeks, dtype=np.int64), cumulative.shape[:1])
+    if len(lengths) and (lengths.min() <= 0 or num_weeks.min() <= 0):
+        raise ValueError("Curves and week counts must have at least one point.")
+
+    # Boundaries of the new weeks on the original point scale; boundaries past the
+    # last week stay at the end of the curve and so receive nothing
+    boundary = np.minimum(np.arange(int(num_weeks.max(initial=0)) + 1), num_weeks[:, None])
+    position = boundary * (lengths / num_weeks)[:, None]
+    slopes = _pchip_slopes(cumulative, lengths) if method == 'pchip' else None
+    shares = np.maximum(np.diff(_interpolate(cumulative, lengths, position, slopes), axis=1), 0.0)
+    total = shares.sum(axis=1, keepdims=True)
+    return np.divide(shares, total, out=np.zeros_like(shares), where=total > 0)
+
+
+# Interpolate a curve onto a new number of weeks and normalize it to sum to 1 (uncached).
+# `cumulative` may pass the curve's precomputed cumulative shares (e.g. CurveRegistry.cumulative).
+def resample_curve(percentages, original_weeks, new_weeks, method='linear', cumulative=None):
+    if method != 'linear':
+        if cumulative is None:
+            cumulative = cumulative_share(percentages)
+        if method == 'area':
+            # Single curve: the linear rebinning is one np.interp over the boundaries
+            boundaries = np.arange(new_weeks + 1) * (original_weeks / new_weeks)
+            shares = np.diff(np.interp(boundaries, np.arange(original_weeks + 1), cumulative))
+            return shares / np.sum(shares)
+        return rebin_cumulative(cumulative, original_weeks, new_weeks, method)[0]
+
+    original_x = np.linspace(0, 1, original_weeks)  # Original weeks scaled to [0, 1]
+    new_x = np.linspace(0, 1, new_weeks)  # New weeks scaled to [0, 1]
+
+    # Interpolate the original curve (np.interp is the same linear interpolation as
+    # scipy's interp1d, without importing scipy or building an interpolator object)
+    scaled_curve = np.interp(new_x, original_x, percentages)
+
+    # Normalize the scaled curve to ensure it sums to 1
+    return scaled_curve / np.sum(scaled_curve)
+
+
+# Function to scale a curve to a new number of weeks.
+# Results are memoized, so repeated calls for the same curve and week count are a single lookup.
+# Pass CurveRegistry.key(name) as `key` for registry curves (a precomputed hash of their
+# values); other curves are hashed here. Never pass a bare name: curve sets may reuse names.
+# `method` is one of RESAMPLE_METHODS.
+# The returned array is shared between callers and is therefore read-only.
+def scale_curve(percentages, original_weeks, new_weeks, key=None, method='linear', cumulative=None):
+    if key is None:
+        key = curve_key(percentages)
+    cache_key = (key, int(original_weeks), int(new_weeks), method)
+
+    curve = resample_cache.get(cache_key)
+    if curve is None:
+        curve = resample_curve(percentages, original_weeks, new_weeks, method, cumulative)
+        curve.setflags(write=False)
+        resample_cache.put(cache_key, curve)
+    return curve
@@ -0,0 +1,96 @@
+import numpy as np
+
+from batch import redistribute_batch
+
+
+# Integer codes and the distinct values they refer to, like a pandas Categorical
+def encode(values):
+    names, codes = np.unique(np.asarray(values), return_inverse=True)
+    return codes.astype(np.int32), names
+
+
+# Compact result of a redistribution.
+#
+# Hours are kept in one (rows x weeks) float array together with integer week
+# counts, week offsets (start week of each row on a shared timeline) and
+# categorical job/shop codes. Week labels, curve fractions and DataFrames are
+# only built on request, when the result is displayed or exported.
+class RedistributionResult:
+    def __init__(self, hours, shops, jobs=None, num_weeks=None, week_offset=None, dtype=np.float64):
+        self.hours = np.atleast_2d(np.asarray(hours, dtype=dtype))
+        rows, width = self.hours.shape
+        self.shop_codes, self.shop_names = encode(np.broadcast_to(np.asarray(shops), (rows,)))
+        self.job_codes, self.job_names = encode(np.broadcast_to(np.asarray("" if jobs is None else jobs), (rows,)))
+        self.num_weeks = np.broadcast_to(np.asarray(width if num_weeks is None else num_weeks, dtype=np.int32), (rows,)).copy()
+        self.week_offset = np.broadcast_to(np.asarray(0 if week_offset is None else week_offset, dtype=np.int32), (rows,)).copy()
+
+    def __len__(self):
+        return len(self.hours)
+
+    @property
+    def nbytes(self):
+        arrays = (self.hours, self.shop_codes, self.job_codes, self.num_weeks, self.week_offset)
+        return sum(a.nbytes for a in arrays)
+
+    @property
+    def shops(self):
+        return self.shop_names[self.shop_codes]
+
+    @property
+    def jobs(self):
+        return self.job_names[self.job_codes]
+
+    # Hours of one row, without the padding beyond its week count
+    def row_hours(self, row=0):
+        return self.hours[row, :self.num_weeks[row]]
+
+    # Share of the row's hours in each week (the redistributed curve)
+    def curve(self, row=0):
+        hours = self.row_hours(row).astype(np.float64)
+        total = hours.sum()
+        return hours / total if total > 0 else np.zeros_like(hours)
+
+    def week_labels(self, num_weeks=None):
+        num_weeks = self.hours.shape[1] if num_weeks is None else num_weeks
+        return [f"Week {i+1}" for i in range(num_weeks)]
+
+    # Per-week table of one row, as shown in the apps
+    def week_frame(self, row=0):
+        import pandas as pd
+
+        num_weeks = self.num_weeks[row]
+        return pd.DataFrame({
+            'Week': self.week_labels(num_weeks),
+            'Redistributed Hours': self.row_hours(row),
+            'Curve Value': self.curve(row),
+        })
+
+    # All rows as one wide DataFrame indexed by categorical (job, shop)
+    def to_frame(self):
+        import pandas as pd
+
+        index = pd.MultiIndex.from_arrays([
+            pd.Categorical.from_codes(self.job_codes, self.job_names),
+            pd.Categorical.from_codes(self.shop_codes, self.shop_names),
+        ], names=['Job', 'Shop'])
+        return pd.DataFrame(self.hours, index=index, columns=self.week_labels())
+
+    # (labels, values) blocks for excel_export.ExcelStreamWriter: Job, Shop, then one column per week
+    def excel_blocks(self, block_rows=5000):
+        for start in range(0, len(self), block_rows):
+            end = start + block_rows
+            # Decode only this block's codes; self.jobs / self.shops would decode every row per block
+            jobs = self.job_names[self.job_codes[start:end]]
+            shops = self.shop_names[self.shop_codes[start:end]]
+            yield [jobs, shops], self.hours[start:end]
+
+    # Per-week blocks of one row for excel_export: Week, Redistributed Hours, Curve Value
+    def week_blocks(self, row=0):
+        values = np.column_stack([self.row_hours(row), self.curve(row)])
+        yield [self.week_labels(self.num_weeks[row])], values
+
+
+# Redistribute a batch straight into a compact result
+def redistribute_result(curves, total_hours, curve_ids, num_weeks, jobs=None, dtype=np.float64):
+    hours = redistribute_batch(curves, total_hours, curve_ids, num_weeks)
+    return RedistributionResult(hours, curve_ids, jobs, num_weeks, dtype=dtype)
@@ -0,0 +1,236 @@
+import glob
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from batch import redistribute_batch
+
+# Default limit on the size of a result cache directory
+DEFAULT_CACHE_BYTES = 2 * 1024**3
+# Bump when the way results are computed changes, so old cache entries are never reused
+CACHE_FORMAT = 1
+
+# Multipliers that mix the four 64-bit words of a row key into one lookup fingerprint
+_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5], dtype=np.uint64)
+
+
+# 16-byte digest of every curve name, from the curve's content (shapes from their name),
+# the resampling method and `salt` (anything else the results depend on, e.g. rounding).
+# Editing a curve changes only its own digest, so only the rows that used it miss.
+def curve_digests(curves, names, method='linear', salt=''):
+    digests = {}
+    for name in names:
+        h = hashlib.blake2b(f"{CACHE_FORMAT}|{method}|{salt}|".encode(), digest_size=16)
+        if name in curves:
+            h.update(np.ascontiguousarray(curves[name], dtype=np.float64).tobytes())
+        else:
+            h.update(f"shape:{name}".encode())
+        digests[name] = h.digest()
+    return digests
+
+
+# Content key of every (curve, hours, weeks) row as a (rows x 4) uint64 array:
+# the curve digest followed by the exact bits of the hours and the week count
+def row_keys(curves, curve_ids, total_hours, num_weeks, method='linear', salt=''):
+    names, codes = np.unique(np.asarray(curve_ids), return_inverse=True)
+    digests = curve_digests(curves, names, method, salt)
+    keys = np.empty((len(codes), 4), dtype=np.uint64)
+    if len(names):
+        keys[:, :2] = np.frombuffer(b"".join(digests[name] for name in names), dtype=np.uint64).reshape(-1, 2)[codes]
+    keys[:, 2] = np.asarray(total_hours, dtype=np.float64).view(np.uint64)
+    keys[:, 3] = np.asarray(num_weeks, dtype=np.int64).astype(np.uint64)
+    return keys
+
+
+def _fingerprint(keys):
+    return np.bitwise_xor.reduce(keys * _MIX, axis=1)
+
+
+# Persistent, content-addressed cache of redistributed rows in a directory.
+#
+# Rows computed together are stored as one block: `<digest>.npy` holds the
+# (rows x weeks) results and `<digest>.keys.npy` their row keys (see row_keys); the
+# digest is taken over the keys, so recomputing the same rows rewrites the same block.
+# Blocks are read as memory maps, so a lookup only reads the rows it needs. An index of
+# every stored key is built when the cache is opened and new blocks are merged into it,
+# so storing a block costs in proportion to the block, not the whole cache. When the
+# directory grows past `max_bytes`, the least recently used blocks are deleted.
+# Meant for one process at a time (e.g. a nightly brt_cli run).
+class ResultCache:
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._keys = {}
+        # Bytes on disk and last use (for eviction) of every block, kept in memory
+        self._sizes = {}
+        self._used = {}
+        self._reindex()
+
+    def _path(self, block, suffix='.npy'):
+        return os.path.join(self.directory, block + suffix)
+
+    def _reindex(self):
+        self._keys.clear()
+        self._sizes.clear()
+        self._used.clear()
+        for path in glob.glob(os.path.join(self.directory, "*.keys.npy")):
+            block = os.path.basename(path)[:-len(".keys.npy")]
+            if os.path.exists(self._path(block)):
+                self._keys[block] = np.load(path)
+                self._sizes[block] = os.path.getsize(self._path(block)) + os.path.getsize(path)
+                self._used[block] = os.path.getmtime(self._path(block))
+        self._rebuild_index()
+
+    # Sorted fingerprints of every stored key, with the block and row they live in
+    def _rebuild_index(self):
+        self._names = list(self._keys)
+        keys = [self._keys[block] for block in self._names]
+        self._index_keys = np.concatenate(keys) if keys else np.empty((0, 4), dtype=np.uint64)
+        self._index_block = np.repeat(np.arange(len(keys)), [len(k) for k in keys])
+        self._index_row = np.concatenate([np.arange(len(k)) for k in keys]) if keys else np.empty(0, dtype=np.int64)
+        fingerprints = _fingerprint(self._index_keys)
+        order = np.argsort(fingerprints, kind='stable')
+        self._fingerprints = fingerprints[order]
+        self._index_keys, self._index_block, self._index_row = (
+            self._index_keys[order], self._index_block[order], self._index_row[order])
+
+    # Merge the keys of a new block into the sorted index
+    def _index_block_keys(self, block, keys):
+        fingerprints = _fingerprint(keys)
+        order = np.argsort(fingerprints, kind='stable')
+        at = np.searchsorted(self._fingerprints, fingerprints[order], side='right')
+        self._fingerprints = np.insert(self._fingerprints, at, fingerprints[order])
+        self._index_keys = np.insert(self._index_keys, at, keys[order], axis=0)
+        self._index_block = np.insert(self._index_block, at, len(self._names))
+        self._index_row = np.insert(self._index_row, at, order)
+        self._names.append(block)
+
+    @property
+    def size_bytes(self):
+        return sum(self._sizes.values())
+
+    def __len__(self):
+        return len(self._index_keys)
+
+    # Positions of `keys` in the index, -1 where a key is not stored
+    def _find(self, keys):
+        if not len(self._fingerprints):
+            return np.full(len(keys), -1)
+        fingerprints = _fingerprint(keys)
+        pos = np.minimum(np.searchsorted(self._fingerprints, fingerprints), len(self._fingerprints) - 1)
+        found = (self._fingerprints[pos] == fingerprints) & (self._index_keys[pos] == keys).all(axis=1)
+        return np.where(found, pos, -1)
+
+    # Stored rows of `keys`, written into the first `width` columns of a zero matrix.
+    # Returns (values, found) where `found` marks the rows that came from the cache.
+    # When `keys` are exactly one stored block (an unchanged chunk) the block's read-only
+    # memory map is returned as is, without copying.
+    def fetch(self, keys, width):
+        pos = self._find(keys)
+        found = pos >= 0
+        self.hits += int(found.sum())
+        self.misses += int(len(keys) - found.sum())
+        blocks = np.unique(self._index_block[pos[found]])
+        for b in blocks:
+            # Mark the block as recently used for eviction (on disk too, for the next run)
+            self._used[self._names[b]] = time.time()
+            os.utime(self._path(self._names[b]))
+
+        if found.all() and len(blocks) == 1:
+            stored = np.load(self._path(self._names[blocks[0]]), mmap_mode='r')
+            if stored.shape == (len(keys), width) and np.array_equal(self._index_row[pos], np.arange(len(keys))):
+                return stored, found
+
+        values = np.zeros((len(keys), width))
+        for b in blocks:
+            rows = np.flatnonzero(found)[self._index_block[pos[found]] == b]
+            stored = np.load(self._path(self._names[b]), mmap_mode='r')
+            columns = min(width, stored.shape[1])
+            values[rows, :columns] = stored[self._index_row[pos[rows]], :columns]
+        return values, found
+
+    # Store computed rows as a new block, then evict old blocks if over the size limit
+    def store(self, keys, values):
+        if not len(keys):
+            return
+        keys = np.ascontiguousarray(keys, dtype=np.uint64)
+        block = hashlib.blake2b(keys.tobytes(), digest_size=16).hexdigest()
+        # Write through temporary files so a crash never leaves a half-written block behind;
+        # the keys go last because they are what makes a block visible
+        for suffix, array in (('.npy', np.asarray(values, dtype=np.float64)), ('.keys.npy', keys)):
+            tmp = self._path(block, '.tmp' + suffix)
+            np.save(tmp, array)
+            os.replace(tmp, self._path(block, suffix))
+        if block not in self._keys:
+            # A rewritten block has the same keys, which are indexed already
+            self._keys[block] = keys
+            self._index_block_keys(block, keys)
+        self._sizes[block] = os.path.getsize(self._path(block)) + os.path.getsize(self._path(block, '.keys.npy'))
+        self._used[block] = time.time()
+        if self.evict():
+            self._rebuild_index()
+
+    # Delete least recently used blocks until the cache fits in `max_bytes`.
+    # Returns whether any block was deleted.
+    def evict(self):
+        size = self.size_bytes
+        if size <= self.max_bytes:
+            return False
+        blocks = sorted(self._keys, key=self._used.get)
+        while blocks and size > self.max_bytes:
+            block = blocks.pop(0)
+            size -= self._sizes.pop(block)
+            os.remove(self._path(block, '.keys.npy'))
+            os.remove(self._path(block))
+            del self._keys[block]
+            del self._used[block]
+        return True
+
+    def clear(self):
+        for block in list(self._keys):
+            os.remove(self._path(block, '.keys.npy'))
+            os.remove(self._path(block))
+        self._keys.clear()
+        self._sizes.clear()
+        self._used.clear()
+        self._rebuild_index()
+        self.hits = 0
+        self.misses = 0
+
+
+# Redistribute a batch like redistribute_batch, reusing rows stored in `cache`.
+# Only rows whose (curve content, hours, weeks) are not cached are computed (each
+# distinct one once) by `compute(total_hours, curve_ids, num_weeks)`, which defaults to
+# redistribute_batch; the new rows are then stored. `salt` must describe anything else
+# `compute` depends on. `num_weeks` is one week count or one per row.
+# The result may be a read-only memory map; copy it before modifying it.
+def cached_redistribute(cache, curves, total_hours, curve_ids, num_weeks, method='linear', compute=None, salt=''):
+    total_hours = np.asarray(total_hours, dtype=np.float64)
+    curve_ids = np.asarray(curve_ids)
+    num_weeks = np.broadcast_to(np.asarray(num_weeks, dtype=np.int64), total_hours.shape)
+    if compute is None:
+        def compute(hours, ids, weeks):
+            return redistribute_batch(curves, hours, ids, weeks, method)
+
+    keys = row_keys(curves, curve_ids, total_hours, num_weeks, method, salt)
+    values, found = cache.fetch(keys, int(num_weeks.max(initial=0)))
+    missing = np.flatnonzero(~found)
+    if not len(missing):
+        return values
+
+    # Identical rows are computed once (keys compared as whole 32-byte records)
+    records = np.ascontiguousarray(keys[missing]).view('V32').ravel()
+    _, first, inverse = np.unique(records, return_index=True, return_inverse=True)
+    rows = missing[first]
+    computed = compute(total_hours[rows], curve_ids[rows], num_weeks[rows])
+    cache.store(keys[rows], computed)
+    if len(rows) == len(values):
+        # Nothing was cached and every row is distinct: the computed rows are the result
+        return computed[inverse.ravel()]
+    values[missing, :computed.shape[1]] = computed[inverse.ravel()]
+    return values
@@ -0,0 +1,268 @@
+"""Local HTTP/JSON service for the Budget Redistribution Tool.
+
+Runs in one long-lived process, so the curve table and the resampling cache stay
+warm across requests. Requests are served on threads (ThreadingHTTPServer) over
+HTTP/1.1 keep-alive connections. Only the standard library and NumPy are needed;
+Arrow responses additionally need pyarrow.
+
+Endpoints:
+    GET  /health                 status, curve set version and cache statistics
+    GET  /curves                 names of the available curves and shapes
+    POST /redistribute           one job:  {"curve": "ELE", "total_hours": 1000, "num_weeks": 50}
+                                 or a custom curve: {"values": [...], "total_hours": 1000, "num_weeks": 50}
+    POST /redistribute/batch     many jobs: {"curves": [...], "total_hours": [...], "num_weeks": 50 or [...]}
+
+Both POST endpoints accept "method" (linear, area or pchip); the batch endpoint also
+accepts "jobs" (labels echoed back) and "quantum" (round hours while keeping totals).
+Send "Accept: application/vnd.apache.arrow.stream" to the batch endpoint for an Arrow
+IPC stream (long layout: job, shop, week, hours) instead of JSON.
+Week counts must be whole numbers up to MAX_WEEKS, and a batch may have at most
+MAX_BATCH_ROWS jobs and MAX_BATCH_CELLS (jobs x longest job) weeks.
+
+Example:
+    python service.py --port 8765
+    curl -s localhost:8765/redistribute -d '{"curve": "ELE", "total_hours": 1000, "num_weeks": 10}'
+"""
+import argparse
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from allocation import allocate_exact
+from batch import SHAPE_NAMES, redistribute_batch, redistribute_custom_batch
+from curve_registry import registry
+from resample import RESAMPLE_METHODS, resample_cache, scale_curve
+
+JSON_TYPE = 'application/json'
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+# Largest request body accepted (bytes)
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# Limits that keep one request from allocating more than a few hundred MB in the server
+MAX_WEEKS = 1040
+MAX_BATCH_ROWS = 200_000
+MAX_BATCH_CELLS = 20_000_000
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _method(request):
+    method = request.get('method', 'linear')
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"Unknown resampling method '{method}'. Use one of: {', '.join(RESAMPLE_METHODS)}")
+    return method
+
+
+# A number (rows=None) or a list of one number per row from the request, as float64
+# (broadcast to `rows`); anything else is refused with a message naming the field
+def _numbers(value, field, rows=None):
+    try:
+        numbers = np.asarray(value, dtype=np.float64)
+    except (ValueError, TypeError):
+        numbers = None
+    if numbers is None or numbers.ndim > (0 if rows is None else 1) or (numbers.ndim == 1 and len(numbers) != rows):
+        expected = "a number" if rows is None else f"a number or a list with one number per curve ({rows})"
+        raise ValueError(f"'{field}' must be {expected}.")
+    return numbers if rows is None else np.broadcast_to(numbers, (rows,))
+
+
+# Week counts as int64: whole numbers from 1 to MAX_WEEKS (a JSON 52.0 is accepted, 52.5 is not)
+def _weeks(value, rows=None):
+    weeks = _numbers(value, 'num_weeks', rows)
+    if not np.all(np.isfinite(weeks)) or np.any(weeks != np.round(weeks)):
+        raise ValueError("'num_weeks' must be whole numbers.")
+    if np.any(weeks < 1) or np.any(weeks > MAX_WEEKS):
+        raise ValueError(f"'num_weeks' must be between 1 and {MAX_WEEKS}.")
+    return weeks.astype(np.int64)
+
+
+def _hours(value, rows=None):
+    hours = _numbers(value, 'total_hours', rows)
+    if not np.all(np.isfinite(hours)):
+        raise ValueError("'total_hours' must be finite numbers.")
+    return hours
+
+
+# A list field of the request (curves, jobs, values) as a 1-D array
+def _list(value, field, message, dtype=None):
+    try:
+        values = np.asarray(value, dtype=dtype)
+    except (ValueError, TypeError):
+        values = None
+    if values is None or values.ndim != 1:
+        raise ValueError(f"'{field}' must be {message}.")
+    return values
+
+
+# Single job: a named curve or shape, or custom values resampled to num_weeks
+def redistribute_single(request):
+    total_hours = float(_hours(request['total_hours']))
+    method = _method(request)
+    if 'values' in request:
+        message = f"a list of 1 to {MAX_WEEKS} non-negative numbers with a positive sum"
+        values = _list(request['values'], 'values', message, np.float64)
+        if len(values) == 0 or len(values) > MAX_WEEKS or not np.all(np.isfinite(values)) \
+                or np.any(values < 0) or values.sum() <= 0:
+            raise ValueError(f"'values' must be {message}.")
+        num_weeks = int(_weeks(request.get('num_weeks', len(values))))
+        hours = redistribute_custom_batch(values[None], [len(values)], [total_hours], [num_weeks], method)[0]
+        curve = 'custom'
+    else:
+        curve = str(request['curve'])
+        num_weeks = int(_weeks(request['num_weeks']))
+        hours = redistribute_batch(registry, [total_hours], [curve], num_weeks, method)[0]
+    return {'curve': curve, 'num_weeks': num_weeks, 'hours': hours.tolist()}
+
+
+# Many jobs in one pass: (hours matrix, per-row week counts, jobs, curve ids)
+def redistribute_many(request):
+    message = f"a list of at most {MAX_BATCH_ROWS} curve names"
+    curve_ids = _list(request['curves'], 'curves', message).astype(str)
+    if len(curve_ids) > MAX_BATCH_ROWS:
+        raise ValueError(f"'curves' must be {message}.")
+    rows = len(curve_ids)
+    total_hours = _hours(request['total_hours'], rows)
+    num_weeks = _weeks(request['num_weeks'], rows)
+    if rows * int(num_weeks.max(initial=0)) > MAX_BATCH_CELLS:
+        raise ValueError(f"The batch is too large (rows x longest job over {MAX_BATCH_CELLS:,} weeks); split it up.")
+    jobs = _list(request.get('jobs', np.arange(rows)), 'jobs', "a list with one entry per curve")
+    if len(jobs) != rows:
+        raise ValueError("'jobs' must be a list with one entry per curve.")
+    hours = redistribute_batch(registry, np.ascontiguousarray(total_hours), curve_ids, num_weeks, _method(request))
+    if request.get('quantum'):
+        hours = allocate_exact(hours, total_hours, float(_numbers(request['quantum'], 'quantum')))
+    return hours, num_weeks, jobs, curve_ids
+
+
+def _arrow_stream(hours, num_weeks, jobs, curve_ids):
+    import pyarrow as pa
+
+    from columnar_export import long_table
+
+    table = long_table(hours, jobs, curve_ids, num_weeks)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class RedistributionHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests (every response sets Content-Length)
+    protocol_version = 'HTTP/1.1'
+    # Send small responses right away instead of waiting on the client's delayed ACK
+    disable_nagle_algorithm = True
+    quiet = False
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json({
+                'status': 'ok',
+                'curve_set_version': registry.version,
+                'cache': {'entries': len(resample_cache), 'hits': resample_cache.hits, 'misses': resample_cache.misses},
+            })
+        elif self.path == '/curves':
+            self.send_json({'curves': registry.names, 'shapes': list(SHAPE_NAMES), 'points': registry.points,
+                            'methods': list(RESAMPLE_METHODS)})
+        else:
+            self.send_error_json(404, f"Unknown path {self.path}")
+
+    def do_POST(self):
+        try:
+            request = self.read_json()
+            if self.path == '/redistribute':
+                self.send_json(redistribute_single(request))
+            elif self.path == '/redistribute/batch':
+                hours, num_weeks, jobs, curve_ids = redistribute_many(request)
+                if ARROW_TYPE in self.headers.get('Accept', ''):
+                    try:
+                        body = _arrow_stream(hours, num_weeks, jobs, curve_ids)
+                    except ImportError:
+                        raise RequestError(406, "Arrow responses need pyarrow, which is not installed.")
+                    self.send_body(200, ARROW_TYPE, body)
+                else:
+                    self.send_json({'jobs': jobs.tolist(), 'curves': curve_ids.tolist(),
+                                    'num_weeks': num_weeks.tolist(), 'hours': hours.tolist()})
+            else:
+                raise RequestError(404, f"Unknown path {self.path}")
+        except RequestError as e:
+            self.send_error_json(e.status, str(e))
+        except KeyError as e:
+            self.send_error_json(400, f"Missing field {e}")
+        except (ValueError, TypeError) as e:
+            self.send_error_json(400, str(e))
+        except Exception as e:
+            # Anything else is a bug; answer instead of dropping the connection
+            self.log_error("Error handling %s: %r", self.path, e)
+            self.send_error_json(500, f"Internal error: {e}")
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length > MAX_BODY_BYTES:
+            # The body is never read, so the connection cannot be reused
+            self.close_connection = True
+            raise RequestError(413, f"Request body larger than {MAX_BODY_BYTES} bytes.")
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError as e:
+            raise RequestError(400, f"Invalid JSON: {e}")
+        if not isinstance(request, dict):
+            raise RequestError(400, "The request body must be a JSON object.")
+        return request
+
+    def send_json(self, data, status=200):
+        self.send_body(status, JSON_TYPE, json.dumps(data).encode())
+
+    def send_error_json(self, status, message):
+        self.send_json({'error': message}, status)
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+# Fill the resampling cache with every curve for 1..max_weeks weeks before serving
+def warm_cache(max_weeks, method='linear'):
+    for weeks in range(1, max_weeks + 1):
+        for name in registry.names:
+            scale_curve(registry[name], registry.points, weeks, key=registry.key(name), method=method)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serve redistributions over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: local only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--warm-weeks", type=int, default=200,
+                        help="Resample every curve for 1..N weeks at startup (0 to skip)")
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    warm_cache(args.warm_weeks)
+    RedistributionHandler.quiet = args.quiet
+    server = ThreadingHTTPServer((args.host, args.port), RedistributionHandler)
+    server.daemon_threads = True
+    print(f"Serving on http://{args.host}:{server.server_port} ({len(resample_cache)} curves cached)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
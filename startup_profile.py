@@ -0,0 +1,106 @@
+"""Measure the cold-start import cost of every entry point.
+
+Each entry point's top-level imports are replayed in a fresh interpreter with
+`python -X importtime`, so the GUI is never launched. The report lists the
+cumulative cost of each imported package and the total, and the exit status
+is non-zero when an entry point cannot be imported or exceeds the budget.
+
+Example:
+    python startup_profile.py --budget-ms 800
+    python startup_profile.py qt_app.py --json
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ENTRY_POINTS = ["app.py", "new_app.py", "qt_app.py", "tkinter_brt.py", "brt_cli.py"]
+
+
+# Source of the import statements at the top level of a module, in order
+def top_level_imports(path):
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+# Run the imports in a fresh interpreter and return ({package: cumulative ms}, total ms)
+def measure_imports(statements):
+    code = "import time\n_start = time.perf_counter()\n"
+    code += "\n".join(statements)
+    code += "\nprint(f'{(time.perf_counter() - _start) * 1000:.3f}')\n"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=HERE,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    # Lines look like "import time:   self [us] | cumulative |   package"; the
+    # packages imported directly by the entry point are the ones without indentation.
+    packages = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith(" ") and not name.startswith("  "):
+            packages[name.strip()] = int(cumulative) / 1000
+    return packages, float(proc.stdout.strip().splitlines()[-1])
+
+
+def profile(entry_points):
+    report = {}
+    for entry_point in entry_points:
+        statements = top_level_imports(os.path.join(HERE, entry_point))
+        try:
+            packages, total = measure_imports(statements)
+        except RuntimeError as e:
+            report[entry_point] = {"error": str(e)}
+            continue
+        report[entry_point] = {"total_ms": round(total, 1), "imports_ms": {k: round(v, 1) for k, v in packages.items()}}
+    return report
+
+
+def print_report(report, top):
+    for entry_point, result in report.items():
+        if "error" in result:
+            print(f"{entry_point}: could not import ({result['error']})")
+            continue
+        print(f"{entry_point}: {result['total_ms']:.1f} ms")
+        slowest = sorted(result["imports_ms"].items(), key=lambda item: item[1], reverse=True)[:top]
+        for name, ms in slowest:
+            print(f"    {ms:8.1f} ms  {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report per-import cold-start cost of the entry points.")
+    parser.add_argument("entry_points", nargs="*", default=ENTRY_POINTS, help="Scripts to measure (default: all)")
+    parser.add_argument("--budget-ms", type=float, help="Fail if any entry point takes longer than this to import")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list per entry point")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = profile(args.entry_points)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.top)
+
+    # An entry point that cannot be imported fails the run; it never counts as fast
+    failed = [name for name, result in report.items() if "error" in result]
+    if failed:
+        print(f"Could not import: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    if args.budget_ms is not None:
+        over = [name for name, result in report.items() if result["total_ms"] > args.budget_ms]
+        if over:
+            print(f"Over the {args.budget_ms:.0f} ms budget: {', '.join(over)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
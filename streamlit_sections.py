@@ -0,0 +1,219 @@
+import io
+
+import streamlit as st
+
+from curve_registry import registry
+from curve_upload import load_curve_table, read_curve_table
+from excel_export import write_xlsx
+from leveling import level_portfolio
+from monte_carlo import simulate_portfolio
+from plotting import CurvePlot, render_png
+from portfolio import load_from_table, portfolio_columns
+
+# Sections shared by the Streamlit frontends (app.py and new_app.py).
+#
+# Results, Excel files and charts are cached across reruns and sessions, keyed on the
+# inputs (uploaded files by their contents), so repeating a request does not recompute,
+# re-encode or re-render anything.
+CACHE_MAX_ENTRIES = 256
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+# The chart of the current session, created once and redrawn on every rerun
+# (Streamlit gives each rerun a new thread, so it cannot be kept per thread)
+def session_plot():
+    if 'curve_plot' not in st.session_state:
+        st.session_state.curve_plot = CurvePlot()
+    return st.session_state.curve_plot
+
+
+# Bulk custom curves from an uploaded file, keyed on the file contents
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def bulk_redistribution(data, filename, percentages, total_hours, num_weeks=None):
+    table = load_curve_table(data, filename, percentages)
+    return table.problems(), table.redistribute(total_hours, num_weeks)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def bulk_excel_bytes(data, filename, percentages, total_hours, num_weeks=None):
+    _, result = bulk_redistribution(data, filename, percentages, total_hours, num_weeks)
+    output = io.BytesIO()
+    write_xlsx(output, ['Name', 'Curve'] + result.week_labels(), result.excel_blocks(), sheet_name="Redistribution")
+    return output.getvalue()
+
+
+# Portfolio load from an uploaded job list, keyed on the file contents
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def portfolio_from_file(data, filename):
+    return load_from_table(registry, read_curve_table(data, filename))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def portfolio_excel_bytes(data, filename):
+    load = portfolio_from_file(data, filename)
+    output = io.BytesIO()
+    write_xlsx(output, ['Shop'] + load.week_labels(), load.excel_blocks(), sheet_name="Portfolio Load")
+    return output.getvalue()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def portfolio_chart_png(data, filename):
+    load = portfolio_from_file(data, filename)
+    return render_png(load.curves(), title="Portfolio Load", plot=session_plot(), ylabel="Hours per Week",
+                      first_week=load.first_week)
+
+
+# Portfolio leveled against weekly shop capacities (given as (shop, hours) pairs).
+# Returns the leveling result, the plan of the jobs that changed and the leveled chart.
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def leveled_portfolio(data, filename, capacity, max_delay, stretch, solver):
+    shops, start_weeks, num_weeks, total_hours = portfolio_columns(read_curve_table(data, filename))
+    leveled = level_portfolio(
+        registry, shops, start_weeks, num_weeks, total_hours, dict(capacity),
+        max_delay=max_delay, stretch=(1.0, 1.25, 1.5) if stretch else (1.0,), solver=solver,
+    )
+    plan = leveled.plan_frame(shops=shops).iloc[leveled.changed()]
+    chart = render_png(leveled.after.curves(), title="Leveled Portfolio Load", plot=session_plot(),
+                       ylabel="Hours per Week", first_week=leveled.after.first_week)
+    return leveled, plan, chart
+
+
+# P10/P50/P90 weekly load bands of the portfolio with +/- ranges on hours and weeks
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def portfolio_bands(data, filename, hours_spread, weeks_spread, scenarios):
+    shops, start_weeks, num_weeks, total_hours = portfolio_columns(read_curve_table(data, filename))
+    return simulate_portfolio(
+        registry, shops, start_weeks, num_weeks, total_hours,
+        hours_low=total_hours * (1 - hours_spread), hours_high=total_hours * (1 + hours_spread),
+        weeks_low=num_weeks * (1 - weeks_spread), weeks_high=num_weeks * (1 + weeks_spread),
+        scenarios=scenarios, seed=0,
+    )
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def portfolio_bands_png(data, filename, hours_spread, weeks_spread, scenarios, shop):
+    bands = portfolio_bands(data, filename, hours_spread, weeks_spread, scenarios)
+    band = bands.band(shop)
+    return render_png(
+        {f"{shop} P50": band['P50']}, title=f"{shop} Load, P10-P90 over {scenarios} Scenarios", plot=session_plot(),
+        ylabel="Hours per Week", first_week=bands.first_week, bands={f"{shop} P50": (band['P10'], band['P90'])},
+    )
+
+
+# Bulk upload: redistribute many custom curves (one per row) in one pass.
+# `percentages_label` is the app's name for values that are percentages to be scaled.
+def bulk_section(total_hours, num_weeks, percentages_label):
+    st.header("Bulk Custom Curves")
+    uploaded_file = st.file_uploader(
+        "Upload a CSV or xlsx file with one curve per row: optional 'name', 'total_hours' and "
+        "'num_weeks' columns followed by the curve values",
+        type=['csv', 'xlsx'],
+    )
+    bulk_values = st.radio("Uploaded values are", ['weekly values', percentages_label], horizontal=True)
+    if uploaded_file is None:
+        return
+    # Weekly values keep their own length; percentages are scaled to the number of weeks above
+    bulk_percentages = bulk_values == percentages_label
+    bulk_inputs = (uploaded_file.getvalue(), uploaded_file.name, bulk_percentages, total_hours,
+                   num_weeks if bulk_percentages else None)
+    try:
+        problems, bulk_result = bulk_redistribution(*bulk_inputs)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    if problems:
+        st.warning(f"{len(problems)} row(s) were skipped:")
+        st.dataframe([{'Row': row, 'Name': name, 'Problem': message} for row, name, message in problems])
+    st.write(f"Redistributed {len(bulk_result)} curve(s):")
+    st.dataframe(bulk_result.to_frame())
+    st.download_button(
+        "Download Excel File",
+        data=bulk_excel_bytes(*bulk_inputs),
+        file_name="redistributed_curves.xlsx",
+        mime=XLSX_MIME,
+        key="bulk_download",
+    )
+
+
+# Portfolio loading: stack many jobs on a shared timeline into the weekly load of every
+# shop, with leveling and Monte Carlo expanders
+def portfolio_section():
+    st.header("Portfolio Loading")
+    portfolio_file = st.file_uploader(
+        "Upload a CSV or xlsx job list with 'shop', 'start_week', 'weeks' and 'hours' columns",
+        type=['csv', 'xlsx'],
+        key="portfolio_file",
+    )
+    if portfolio_file is None:
+        return
+    portfolio_inputs = (portfolio_file.getvalue(), portfolio_file.name)
+    try:
+        load = portfolio_from_file(*portfolio_inputs)
+    except (ValueError, KeyError) as e:
+        st.error(str(e))
+        return
+    peak_week, peak_hours = load.peak()
+    st.write(f"{len(load.shops)} shop(s) over {len(load.weeks)} weeks; "
+             f"peak load {peak_hours:,.0f} hours in week {peak_week}.")
+    st.image(portfolio_chart_png(*portfolio_inputs))
+    st.dataframe(load.to_frame())
+    st.download_button(
+        "Download Excel File",
+        data=portfolio_excel_bytes(*portfolio_inputs),
+        file_name="portfolio_load.xlsx",
+        mime=XLSX_MIME,
+        key="portfolio_download",
+    )
+    leveling_expander(portfolio_inputs, load)
+    monte_carlo_expander(portfolio_inputs, load)
+
+
+# Resource leveling: shift or stretch jobs so shops stay within their weekly capacity
+def leveling_expander(portfolio_inputs, load):
+    with st.expander("Level against shop capacity"):
+        capacity = {}
+        capacity_columns = st.columns(4)
+        for i, shop in enumerate(load.shops):
+            limit = capacity_columns[i % 4].number_input(
+                f"{shop} hours/week", min_value=0.0, value=0.0, step=100.0, key=f"capacity_{shop}",
+                help="0 = unlimited",
+            )
+            if limit > 0:
+                capacity[shop] = limit
+        max_delay = st.slider("Latest start delay (weeks)", min_value=0, max_value=26, value=8)
+        stretch = st.checkbox("Allow stretching durations by up to 50%", value=True)
+        solver = st.radio("Solver", ['greedy', 'lp'], horizontal=True)
+        if not st.button("Level Portfolio"):
+            return
+        if not capacity:
+            st.warning("Enter a weekly capacity for at least one shop.")
+            return
+        try:
+            leveled, plan, chart = leveled_portfolio(
+                *portfolio_inputs, tuple(sorted(capacity.items())), max_delay, stretch, solver
+            )
+        except (ValueError, ImportError) as e:
+            st.error(str(e))
+            return
+        st.write(leveled.summary())
+        st.image(chart)
+        st.dataframe(plan)
+
+
+# What-if: simulate uncertain hours and durations and show the spread of the weekly load
+def monte_carlo_expander(portfolio_inputs, load):
+    with st.expander("Uncertainty (Monte Carlo)"):
+        hours_spread = st.slider("Hours range (+/- %)", min_value=0, max_value=100, value=10) / 100
+        weeks_spread = st.slider("Duration range (+/- %)", min_value=0, max_value=90, value=10) / 100
+        scenarios = st.number_input("Scenarios", min_value=100, max_value=20000, value=1000, step=100)
+        band_shop = st.selectbox("Shop", ['Total'] + list(load.shops))
+        if not st.button("Simulate"):
+            return
+        bands_inputs = (*portfolio_inputs, hours_spread, weeks_spread, int(scenarios))
+        try:
+            bands = portfolio_bands(*bands_inputs)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.image(portfolio_bands_png(*bands_inputs, band_shop))
+        st.dataframe(bands.to_frame())
@@ -1,141 +1,110 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import numpy as np
-import pandas as pd
-from scipy.interpolate import interp1d
+from tkinter import ttk
 import os
+import queue
+import threading
 from tkinter import filedialog, messagebox
 
-# Define all shop curves
-# Define all curves in a dictionary for easier management
-curves = {
-    "ELE" : [
-        0.13,	0.19,	0.29,	0.58,	1.16,	1.62,	2.10,	2.19,	2.30,	2.39,	
-        2.49,	2.51,	2.57,	2.50,	2.49,	2.49,	2.40,	2.40,	2.40,	2.32,	
-        2.31,	2.31,	2.31,	2.23,	2.13,	2.14,	2.14,	2.14,	2.23,	2.23,	
-        2.31,	2.31,	2.31,	2.31,	2.40,	2.40,	2.40,	2.31,	2.22,	2.09,	
-        1.93,	1.81,	1.63,	1.60,	1.62,	1.89,	1.97,	1.89,	1.71,	1.20
-    ],
-
-    "ISM" : [
-        0.35,	0.54,	0.79,	1.44,	1.67,	1.76,	2.29,	2.73,	3.75,	4.95,	
-        5.54,	6.14,	6.14,	6.44,	6.44,	6.29,	6.29,	5.99,	5.31,	4.29,	
-        3.51,	3.00,	2.97,	2.83,	2.64,	2.31,	2.10,	1.50,	0.00,	0.00,	
-        0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	
-        0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00
-    ],
-
-    "OSM" : [
-        0.22,	0.33,	0.50,	1.00,	2.01,	2.61,	2.87,	2.99,	3.13,	3.28,	
-        3.35,	3.32,	3.19,	3.06,	2.90,	2.70,	2.60,	2.56,	2.60,	2.70,	
-        2.79,	2.90,	3.01,	3.07,	3.08,	3.09,	3.09,	3.09,	2.99,	2.77,	
-        2.67,	2.67,	2.58,	2.52,	2.38,	2.24,	1.93,	1.65,	1.33,	1.04,	
-        0.73,	0.00,	0.00,	0.00,	0.00,	0.11,	0.12,	0.12,	0.11,	0.00,
-    ],
-
-    "PIP" : [
-        0.14,	0.20,	0.30,	1.04,	1.22,	1.70,	1.96,	2.09,	2.05,	2.04,	
-        2.04,	2.11,	2.21,	2.31,	2.39,	2.42,	2.48,	2.61,	2.65,	2.64,	
-        2.63,	2.62,	2.60,	2.54,	2.33,	2.54,	2.54,	2.54,	2.54,	2.53,	
-        2.53,	2.53,	2.53,	2.53,	2.49,	2.43,	2.37,	2.26,	2.18,	2.13,	
-        2.07,	1.98,	1.90,	1.80,	1.69,	1.55,	1.25,	0.98,	0.47,	0.32
-    ],
-
-    "PSF" : [
-        0.17,	0.26,	0.39,	0.77,	1.55,	2.32,	3.00,	3.14,	3.29,	3.45,	
-        3.60,	3.75,	3.92,	3.92,	3.97,	3.98,	4.04,	4.13,	4.21,	4.14,	
-        4.06,	4.02,	3.98,	3.85,	3.06,	2.49,	2.44,	2.40,	2.22,	2.15,	
-        1.97,	1.70,	1.43,	1.33,	1.34,	1.21,	0.83,	0.89,	0.63,	0.00,	
-        0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00
-    ],
-
-    "SHM" : [
-        0.14,	0.20,	0.31,	0.63,	1.26,	1.76,	2.29,	2.38,	2.48,	2.60,	
-        2.73,	2.87,	3.00,	3.03,	3.05,	3.09,	3.14,	3.16,	3.20,	3.21,	
-        3.21,	3.21,	3.21,	2.93,	2.70,	2.93,	2.93,	2.93,	2.93,	2.48,	
-        2.48,	2.48,	2.48,	2.48,	2.48,	2.29,	2.09,	1.90,	1.71,	1.51,	
-        1.32,	1.12,	0.93,	0.74,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00
-    ],
-
-    "WLD" : [
-        0.16,	0.24,	0.36,	1.03,	1.44,	2.07,	2.50,	2.67,	2.70,	2.70,	
-        2.77,	2.87,	3.00,	3.08,	3.15,	3.17,	3.24,	3.24,	3.17,	3.08,	
-        3.05,	3.01,	2.98,	2.94,	2.63,	2.65,	2.70,	2.68,	2.65,	2.62,	
-        2.56,	2.46,	2.37,	2.34,	2.31,	2.21,	1.97,	1.85,	1.67,	1.51,	
-        1.34,	1.21,	0.96,	0.69,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00
-    ],
-
-
-    "CRP" : [
-        0.19,	0.28,	0.43,	0.85,	1.70,	2.22,	2.88,	3.01,	3.16,	3.11,	
-        3.08,	3.00,	2.98,	2.93,	2.91,	2.83,	2.78,	2.76,	2.80,	2.85,	
-        2.92,	3.00,	3.03,	3.07,	3.06,	3.00,	2.93,	2.85,	2.73,	2.71,	
-        2.67,	2.57,	2.42,	2.18,	1.93,	1.90,	1.87,	1.59,	1.34,	1.27,	
-        1.19,	1.14,	1.07,	0.81,	0.00,	0.00,	0.00,	0.00,	0.00,	0.00
-    ],
-
-    "LAB" : [
-        0.22,	0.38,	0.78,	1.03,	1.64,	1.83,	1.88,	1.97,	1.98,	1.98,	
-        2.31,	2.45,	2.67,	2.99,	3.21,	3.42,	3.44,	3.47,	3.43,	3.38,	
-        3.32,	3.12,	2.92,	2.83,	2.86,	2.74,	2.74,	2.72,	2.51,	2.41,	
-        2.20,	1.90,	1.87,	1.86,	1.86,	1.81,	1.75,	1.53,	1.36,	1.00,	
-        0.83,	0.76,	1.08,	1.30,	1.38,	1.47,	1.38,	0.99,	0.87,	0.17
-    ],
-
-
-    "LAG" : [
-        0.82,	0.97,	1.03,	1.16,	1.36,	1.46,	1.54,	1.57,	1.73,	1.72,	
-        1.74,	1.75,	1.74,	1.66,	1.62,	1.58,	1.56,	1.54,	1.52,	1.58,	
-        1.65,	1.71,	1.78,	1.80,	1.93,	2.07,	2.15,	2.16,	2.20,	2.30,	
-        2.44,	2.50,	2.61,	2.63,	2.67,	2.73,	2.78,	2.79,	2.80,	2.70,	
-        2.62,	2.53,	2.52,	2.39,	2.40,	2.40,	2.40,	2.33,	2.23,	2.13
-    ],
-
-    "PNT" : [
-        0.82,	0.97,	1.03,	1.16,	1.36,	1.46,	1.54,	1.57,	1.73,	1.72,	
-        1.74,	1.75,	1.74,	1.66,	1.62,	1.58,	1.56,	1.54,	1.52,	1.58,	
-        1.65,	1.71,	1.78,	1.80,	1.93,	2.07,	2.15,	2.16,	2.20,	2.30,	
-        2.44,	2.50,	2.61,	2.63,	2.67,	2.73,	2.78,	2.79,	2.80,	2.70,	
-        2.62,	2.53,	2.52,	2.39,	2.40,	2.40,	2.40,	2.33,	2.23,	2.13
-    ],
-
-    "RIG" : [
-        0.12,	0.18,	0.27,	0.53,	1.06,	1.59,	1.91,	1.99,	2.07,	2.16,	
-        2.24,	2.33,	2.44,	2.46,	2.47,	2.48,	2.49,	2.49,	2.49,	2.48,	
-        2.46,	2.44,	2.39,	2.31,	2.23,	2.31,	2.31,	2.31,	2.31,	2.22,	
-        2.22,	2.22,	2.22,	2.22,	2.22,	2.22,	2.22,	2.22,	2.22,	2.22,	
-        2.22,	2.17,	2.12,	2.10,	2.05,	1.80,	1.61,	1.52,	1.38,	1.29
-
-    ],
-
-    "SUB" : [
-        0.11,	0.20,	0.34,	0.65,	1.12,	1.59,	1.88,	2.12,	2.29,	2.38,	
-        2.51,	2.62,	2.67,	2.79,	2.86,	2.86,	2.86,	2.88,	2.90,	2.89,	
-        2.89,	2.89,	2.90,	2.89,	2.87,	2.83,	2.83,	2.82,	2.75,	2.64,	
-        2.57,	2.50,	2.42,	2.38,	2.34,	2.26,	2.07,	1.96,	1.79,	1.56,	
-        1.43,	1.18,	1.13,	1.08,	0.95,	0.89,	0.80,	0.73,	0.62,	0.51
-    ]
-}
-
-redistribute_hours = []
-
-# Normalize the curves
-for key in curves:
-    curves[key] = curves[key] / np.sum(curves[key])
-
-# Function to scale a curve to a new number of weeks
-def scale_curve(percentages, original_weeks, new_weeks):
-    original_x = np.linspace(0, 1, original_weeks)
-    new_x = np.linspace(0, 1, new_weeks)
-    interpolation_function = interp1d(original_x, percentages, kind='linear')
-    scaled_curve = interpolation_function(new_x)
-    return scaled_curve / np.sum(scaled_curve)
-
-# Function to redistribute hours
-def redistribute_hours(total_hours, num_weeks, curve):
-    original_weeks = len(curve)
-    scaled_curve = scale_curve(curve, original_weeks, num_weeks)
-    return total_hours * scaled_curve
+import numpy as np
+
+from batch import redistribute_batch
+from curve_registry import registry
+from excel_export import ExcelStreamWriter
+from portfolio import stack_load
+from result import RedistributionResult
+
+# How often the Tk loop checks on the background worker (milliseconds)
+POLL_MS = 100
+# Rows written per block when saving, between progress updates
+EXPORT_BLOCK_ROWS = 1000
+
+# Results of every batch redistributed in this session, by job name
+class ResultStore:
+    def __init__(self):
+        self.jobs = {}
+
+    # Store the result of a job; a job name that is already stored is refused unless `replace`
+    def add(self, job, result, replace=False):
+        if job in self.jobs and not replace:
+            raise ValueError(f"A job named '{job}' is already stored.")
+        self.jobs[job] = result
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def num_rows(self):
+        return sum(len(result) for result in self.jobs.values())
+
+    def num_weeks(self):
+        return max((result.hours.shape[1] for result in self.jobs.values()), default=0)
+
+    # (labels, values) blocks for excel_export: one row per job and shop
+    def blocks(self):
+        for result in self.jobs.values():
+            yield from result.excel_blocks(EXPORT_BLOCK_ROWS)
+
+    # Weekly load of every shop over all stored jobs (or the given {job: result}), each placed at its start week
+    def portfolio_load(self, jobs=None):
+        results = list((self.jobs if jobs is None else jobs).values())
+        width = max(r.hours.shape[1] for r in results)
+        return stack_load(
+            np.vstack([np.pad(r.hours, ((0, 0), (0, width - r.hours.shape[1]))) for r in results]),
+            np.concatenate([r.shops for r in results]),
+            np.concatenate([r.week_offset for r in results]),
+            np.concatenate([r.num_weeks for r in results]),
+        )
+
+result_store = ResultStore()
+
+# Messages from the background worker to the Tk loop: ('progress', percent), ('done', ...) or ('error', exception)
+worker_messages = queue.Queue()
+
+# Run `work(report)` on a background thread; `on_done(result)` is called on the Tk thread afterwards.
+# Tk widgets are only touched from the Tk thread: the worker posts messages that poll_worker picks up.
+def run_in_background(description, work, on_done):
+    set_busy(description)
+
+    def report(percent):
+        worker_messages.put(('progress', percent))
+
+    def target():
+        try:
+            result = work(report)
+        except Exception as e:
+            worker_messages.put(('error', e))
+        else:
+            worker_messages.put(('done', (on_done, result)))
+
+    threading.Thread(target=target, daemon=True).start()
+    root.after(POLL_MS, poll_worker)
+
+def poll_worker():
+    try:
+        while True:
+            kind, payload = worker_messages.get_nowait()
+            if kind == 'progress':
+                progress_bar['value'] = payload
+            elif kind == 'error':
+                set_busy(None)
+                messagebox.showerror("Error", f"An error occurred: {payload}")
+                return
+            else:
+                set_busy(None)
+                on_done, result = payload
+                on_done(result)
+                return
+    except queue.Empty:
+        pass
+    root.after(POLL_MS, poll_worker)
+
+# Show what the worker is doing and block new work until it is finished (None = idle)
+def set_busy(description):
+    state = tk.DISABLED if description else tk.NORMAL
+    redistribute_button.config(state=state)
+    save_button.config(state=state)
+    progress_bar['value'] = 0
+    if description:
+        status_label.config(text=f"{description}...")
 
 # Function to handle batch entry
 def process_batch():
@@ -144,43 +113,101 @@ def process_batch():
         if num_weeks <= 0:
             messagebox.showerror("Input Error", "Number of weeks must be greater than 0.")
             return
+        start_week = int(start_entry.get().strip() or 1)
+        if start_week < 1:
+            messagebox.showerror("Input Error", "Start week must be 1 or later.")
+            return
 
-        results = {}
+        shops = []
+        hours = []
 
         for shop, entry in shop_entries.items():
             total_hours = entry.get().strip()
             if total_hours:
-                total_hours = float(total_hours)
-                results[shop] = redistribute_hours(total_hours, num_weeks, curves[shop])
-
-        # Create DataFrame
-        df = pd.DataFrame(results).T
-        df.columns = [f"Week {i+1}" for i in range(num_weeks)]
-        
-        messagebox.showinfo("Success", "PDFs parsed successfully! Press 'Save to Excel' to save hours.")
+                shops.append(shop)
+                hours.append(float(total_hours))
 
     except ValueError:
         messagebox.showerror("Input Error", "Please enter valid numeric values for all fields.")
+        return
+
+    if not shops:
+        messagebox.showerror("Input Error", "Enter hours for at least one shop.")
+        return
+    job = job_entry.get().strip() or f"Job {len(result_store) + 1}"
+    replace = job in result_store.jobs
+    if replace and not messagebox.askyesno("Duplicate Job", f"'{job}' is already stored. Replace it?"):
+        return
+
+    # Redistribute every shop in one batch and find the new portfolio peak on the worker thread
+    # (the store only changes on the Tk thread, in done(), while no work is running)
+    def work(report):
+        result = RedistributionResult(redistribute_batch(registry, hours, shops, num_weeks), shops, jobs=job,
+                                      week_offset=start_week)
+        report(50)
+        peak = result_store.portfolio_load({**result_store.jobs, job: result}).peak()
+        report(100)
+        return result, peak
+
+    def done(results):
+        result, (peak_week, peak_hours) = results
+        result_store.add(job, result, replace=replace)
+        status_label.config(text=f"{job}: {len(shops)} shops redistributed ({len(result_store)} job(s) ready to save).\n"
+                                 f"Portfolio peak: {peak_hours:,.0f} hours in week {peak_week}.")
+
+    run_in_background(f"Redistributing {job}", work, done)
 
 def save_to_excel():
+    if not len(result_store):
+        messagebox.showerror("Nothing to Save", "Press 'Redistribute Hours' first.")
+        return
+
     folder_selected = filedialog.askdirectory(title="Select Folder to Save Files")
 
     if not folder_selected:
         return
     redistributed_hours_file = os.path.join(folder_selected, rf"Redistributed Hours.xlsx")
+    portfolio_load_file = os.path.join(folder_selected, rf"Portfolio Load.xlsx")
 
-    redistributed_hours = pd.DataFrame()
+    # Stream every stored job into the sheet on the worker thread
+    header = ["Job", "Shop"] + [f"Week {i+1}" for i in range(result_store.num_weeks())]
+    total_rows = result_store.num_rows()
 
-    with pd.ExcelWriter(redistributed_hours_file) as writer:
-        redistribute_hours.to_excel(writer, sheet_name='Redistributed Hours', index=False)
+    def work(report):
+        with ExcelStreamWriter(redistributed_hours_file, header, sheet_name='Redistributed Hours') as writer:
+            for labels, values in result_store.blocks():
+                writer.write_block(labels, values)
+                report(100 * (writer.row - 1) / total_rows)
 
-    messagebox.showinfo("Success", f"File saved:\n{redistributed_hours_file}")
+        # All jobs stacked on the shared timeline: one row per shop plus the yard-wide total
+        load = result_store.portfolio_load()
+        with ExcelStreamWriter(portfolio_load_file, ["Shop"] + load.week_labels(), sheet_name='Portfolio Load') as writer:
+            for labels, values in load.excel_blocks():
+                writer.write_block(labels, values)
+        return redistributed_hours_file, portfolio_load_file
+
+    def done(paths):
+        status_label.config(text=f"Saved {total_rows} rows.")
+        messagebox.showinfo("Success", "Files saved:\n" + "\n".join(paths))
+
+    run_in_background("Saving to Excel", work, done)
 
 
 # Create Tkinter window
 root = tk.Tk()
 root.title("Budget Redistribution Tool")
-root.geometry("500x600")
+root.geometry("500x840")
+
+# Job Entry
+tk.Label(root, text="Job:", font=("Dubai", 12)).pack(pady=(15,2))
+job_entry = tk.Entry(root, width=20)
+job_entry.pack(pady=(2,5))
+
+# Start Week Entry (week of the shared portfolio timeline the job starts in)
+tk.Label(root, text="Start Week:", font=("Dubai", 12)).pack(pady=(15,2))
+start_entry = tk.Entry(root, width=7)
+start_entry.insert(0, "1")
+start_entry.pack(pady=(2,5))
 
 # Number of Weeks Entry
 tk.Label(root, text="Enter Desired Number of Weeks:", font=("Dubai", 12)).pack(pady=(15,2))
@@ -193,16 +220,24 @@ frame = tk.Frame(root)
 frame.pack(pady=10)
 
 tk.Label(frame, text="Enter Shop Hours:", font=("Dubai", 12)).grid(row=0, column=1, padx=5)
-for i, shop in enumerate(curves.keys()):
+for i, shop in enumerate(registry.names):
     tk.Label(frame, text=f"{shop}:").grid(row=i+1, column=0, sticky="e", padx=5)
     entry = tk.Entry(frame, width=10)
     entry.grid(row=i+1, column=1, padx=5)
     shop_entries[shop] = entry
 
 # Process Button
-tk.Button(root, text="Redistribute Hours", command=process_batch, font=("Dubai", 10)).pack(pady=10)
+redistribute_button = tk.Button(root, text="Redistribute Hours", command=process_batch, font=("Dubai", 10))
+redistribute_button.pack(pady=10)
+
+save_button = tk.Button(root, text="Save to Excel", command=save_to_excel, font=("Dubai", 10))
+save_button.pack(pady=10)
 
-tk.Button(root, text="Save to Excel", command=save_to_excel, font=("Dubai", 10)).pack(pady=10)
+# Progress of the background worker
+progress_bar = ttk.Progressbar(root, length=300, maximum=100)
+progress_bar.pack(pady=5)
+status_label = tk.Label(root, text="", font=("Dubai", 10))
+status_label.pack(pady=(0,10))
 
 
 # Run Tkinter Loop
@@ -0,0 +1,103 @@
+from functools import lru_cache
+
+import numpy as np
+
+from batch import redistribute_batch
+
+DEFAULT_WEEKMASK = "Mon Tue Wed Thu Fri"
+
+# Number of (calendar, start, weeks) working-day indexes kept in memory
+CALENDAR_CACHE_SIZE = 4096
+
+
+# A site calendar: working weekdays plus holidays and shutdown periods.
+# Calendars compare and hash by their content, so working-day indexes computed for
+# one job are reused by every other job on the same site calendar.
+class WorkCalendar:
+    def __init__(self, holidays=(), shutdowns=(), weekmask=DEFAULT_WEEKMASK):
+        days = [np.datetime64(day, 'D') for day in holidays]
+        for first, last in shutdowns:
+            days.extend(np.arange(np.datetime64(first, 'D'), np.datetime64(last, 'D') + 1))
+        self.holidays = tuple(sorted(set(days)))
+        self.weekmask = weekmask
+        self.busdaycalendar = np.busdaycalendar(weekmask=weekmask, holidays=list(self.holidays))
+
+    @classmethod
+    def from_file(cls, path, weekmask=DEFAULT_WEEKMASK):
+        # One date per line, or "first,last" for a shutdown period; '#' starts a comment
+        holidays, shutdowns = [], []
+        with open(path) as f:
+            for line in f:
+                line = line.split('#')[0].strip()
+                if not line:
+                    continue
+                if ',' in line:
+                    first, last = line.split(',')
+                    shutdowns.append((first.strip(), last.strip()))
+                else:
+                    holidays.append(line)
+        return cls(holidays, shutdowns, weekmask)
+
+    def _key(self):
+        return (self.weekmask, self.holidays)
+
+    def __eq__(self, other):
+        return isinstance(other, WorkCalendar) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    # Working days in the `num_weeks` weeks starting at `start`, and the week (0-based) of each
+    def working_days(self, start, num_weeks):
+        return _working_days(self, np.datetime64(start, 'D'), int(num_weeks))
+
+
+@lru_cache(maxsize=CALENDAR_CACHE_SIZE)
+def _working_days(calendar, start, num_weeks):
+    days = np.arange(start, start + 7 * num_weeks, dtype='datetime64[D]')
+    is_working = np.is_busday(days, busdaycal=calendar.busdaycalendar)
+    working_days = days[is_working]
+    week_of_day = np.flatnonzero(is_working) // 7
+    for array in (working_days, week_of_day):
+        array.setflags(write=False)
+    return working_days, week_of_day
+
+
+# Redistribute a batch of jobs that share one start date and week count over the
+# working days of a site calendar.
+#
+# The curve is resampled onto the working days only, so holidays and shutdown weeks
+# receive no hours. With freq='W' the daily hours are summed into the `num_weeks`
+# calendar weeks starting at `start`; with freq='D' one column per working day is
+# returned. `method` is the resampling method (see resample.RESAMPLE_METHODS).
+# Returns (period start dates, rows x periods hours matrix).
+def redistribute_calendar_batch(curves, total_hours, curve_ids, start, num_weeks, calendar=None, freq='W',
+                                method='linear'):
+    if freq not in ('W', 'D'):
+        raise ValueError("freq must be 'W' (weekly) or 'D' (daily).")
+    calendar = calendar or WorkCalendar()
+    days, week_of_day = calendar.working_days(start, num_weeks)
+    if len(days) == 0:
+        raise ValueError(f"There are no working days in the {num_weeks} week(s) starting {np.datetime64(start, 'D')}.")
+
+    daily = redistribute_batch(curves, total_hours, curve_ids, len(days), method)
+    if freq == 'D':
+        return days, daily
+
+    # Sum the working days of every calendar week; weeks without working days stay at 0
+    weeks, first_day = np.unique(week_of_day, return_index=True)
+    weekly = np.zeros((len(daily), num_weeks))
+    weekly[:, weeks] = np.add.reduceat(daily, first_day, axis=1)
+    week_starts = np.datetime64(start, 'D') + 7 * np.arange(num_weeks)
+    return week_starts, weekly
+
+
+# Calendar-aware version of redistribute_hours for a single job.
+# Returns a pandas Series of hours indexed by week start date (or by working day).
+def redistribute_calendar(curves, total_hours, curve_id, start, num_weeks, calendar=None, freq='W', method='linear'):
+    import pandas as pd
+
+    periods, hours = redistribute_calendar_batch(
+        curves, [total_hours], [curve_id], start, num_weeks, calendar, freq, method
+    )
+    return pd.Series(hours[0], index=pd.DatetimeIndex(periods, name='Date'), name='Redistributed Hours')